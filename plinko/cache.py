@@ -0,0 +1,274 @@
+"""Persistent caches that let Plinko skip work it has already done."""
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import time
+
+from logzero import logger
+
+from plinko import __version__, helpers
+from plinko.config import PLINKO_DATA_DIR, settings
+
+CACHE_DIR = PLINKO_DATA_DIR / "cache"
+IDENTIFIER = re.compile(r"\w+")
+# raised whenever the parser's results change, so results stored before aren't reused
+RESULTS_VERSION = 2
+
+
+def hash_file(file_path):
+    """Return the sha256 hex digest of a file's contents, or None if it doesn't exist."""
+    try:
+        return hashlib.sha256(Path(file_path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def hash_data(data):
+    """Return a stable sha256 hex digest for any json-serializable data."""
+    serialized = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def _atomic_write(path, data):
+    """Write text to a file through a temporary one, so a reader never sees a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text(data)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _touch(path):
+    """Mark a cache entry as used, so eviction keeps it longer."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict(cache_dir=None, max_age=None, max_size=None):
+    """Delete cache entries unused for max_age days, then the least recently used
+    ones until the rest fit within max_size megabytes.
+
+    Both limits default to the cache_max_age and cache_max_size settings.
+    """
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    max_age = settings.get("cache_max_age", 30) if max_age is None else max_age
+    max_size = settings.get("cache_max_size", 1024) if max_size is None else max_size
+    entries = []
+    for entry_path in cache_dir.rglob("*"):
+        try:
+            if entry_path.is_file():
+                stat = entry_path.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+        except OSError:
+            continue
+    oldest, size_left = time.time() - max_age * 86400, max_size * 2**20
+    evicted = 0
+    for mtime, size, entry_path in sorted(entries, reverse=True):
+        if mtime >= oldest and size <= size_left:
+            size_left -= size
+            continue
+        entry_path.unlink(missing_ok=True)
+        evicted += 1
+    if evicted:
+        logger.info(f"Evicted {evicted} of {len(entries)} cache entries")
+
+
+class ParseCache:
+    """Store per-file parse summaries keyed by file contents and analysis settings.
+
+    Each entry also records the content hash of every other file that went into
+    the result (helper modules, conftest files, fixture plugins), so changing
+    any of them invalidates the entry.
+    """
+
+    def __init__(self, settings, cache_dir=None):
+        self.cache_dir = Path(cache_dir or CACHE_DIR / "parse")
+        self.settings_key = hash_data(
+            {"version": __version__, "results": RESULTS_VERSION, **settings}
+        )
+        self._hashes = {}  # {absolute path: sha256} memoized for this run
+        self.hits = self.misses = 0
+
+    def file_hash(self, file_path):
+        file_path = str(Path(file_path).absolute())
+        if file_path not in self._hashes:
+            self._hashes[file_path] = hash_file(file_path)
+        return self._hashes[file_path]
+
+    def forget_hashes(self):
+        """Forget the memoized file hashes, once files may have changed."""
+        self._hashes.clear()
+
+    def _entry_path(self, file_path):
+        file_path = Path(file_path).absolute()
+        key = hash_data([self.settings_key, str(file_path), self.file_hash(file_path)])
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, file_path):
+        """Return the cached data for a file if it, and everything it depends on, is unchanged."""
+        if entry := self.get_entry(file_path):
+            return entry["data"]
+
+    def get_entry(self, file_path, required=()):
+        """Return the whole cached entry for a file, including its dependencies.
+
+        The entry must have been built using every file in required, if given.
+        """
+        entry_path = self._entry_path(file_path)
+        try:
+            entry = json.loads(entry_path.read_text())
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        file_path = Path(file_path).absolute()
+        for dep in required:
+            dep = Path(dep).absolute()
+            if dep != file_path and str(dep) not in entry["dependencies"]:
+                logger.debug(f"Cache entry for {file_path} is stale; {dep} is new")
+                self.misses += 1
+                return None
+        for dep, dep_hash in entry["dependencies"].items():
+            if self.file_hash(dep) != dep_hash:
+                logger.debug(f"Cache entry for {file_path} is stale; {dep} changed")
+                self.misses += 1
+                return None
+        self.hits += 1
+        _touch(entry_path)
+        return entry
+
+    def put(self, file_path, data, dependencies=(), unresolved=()):
+        """Store the data for a file along with the current hash of its dependencies.
+
+        Imports that couldn't be found are kept too, as a module added later may resolve them.
+        """
+        file_path = Path(file_path).absolute()
+        entry = {
+            "file": str(file_path),
+            "dependencies": {
+                str(Path(dep).absolute()): self.file_hash(dep)
+                for dep in dependencies
+                if Path(dep).absolute() != file_path
+            },
+            "unresolved": list(unresolved),
+            "data": data,
+        }
+        _atomic_write(self._entry_path(file_path), json.dumps(entry))
+
+
+class DiffCache:
+    """Store the contents of diff files by their hash, so each is only parsed as YAML once.
+
+    Comp files are large and rarely change, and their contents load from JSON
+    many times faster. Anything JSON can't represent exactly is never stored.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir or CACHE_DIR / "diffs")
+
+    def load(self, diff_path, loader):
+        """Return the contents of a diff file, only calling the loader if none are stored."""
+        key = hash_data([__version__, hash_file(diff_path)])
+        entry_path = self.cache_dir / f"{key}.json"
+        try:
+            contents = json.loads(entry_path.read_text())
+        except (OSError, ValueError):
+            pass
+        else:
+            _touch(entry_path)
+            return contents
+        contents = loader(diff_path)
+        try:
+            serialized = json.dumps(contents)
+        except (TypeError, ValueError):
+            return contents
+        if json.loads(serialized) == contents:
+            _atomic_write(entry_path, serialized)
+        return contents
+
+
+class CodeIndex:
+    """Store the parse results of a test directory, with every entity they were parsed for.
+
+    An entity can only change the results if its name appears in the code that was
+    parsed. The index keeps every identifier from those files. If all the entities
+    of a new diff that appear in the code are already indexed, the stored results
+    only need projecting onto that diff's entities. That holds because the parser
+    follows the same calls and variables whichever entities it knows, so indexes
+    from parsers before that (RESULTS_VERSION) aren't used.
+
+    Indexes are kept per directory, repository commit and analysis settings. One
+    is only used while the test files, and every file read to build it, are unchanged.
+    Each test file's results also list the files they used, so an index can be
+    brought up to date by parsing only the test files affected by a change.
+    """
+
+    def __init__(self, settings, cache_dir=None):
+        self.cache_dir = Path(cache_dir or CACHE_DIR / "index")
+        self.settings_key = hash_data(
+            {"version": __version__, "results": RESULTS_VERSION, **settings}
+        )
+
+    def _entry_path(self, dir_path, commit=None):
+        dir_path = Path(dir_path).absolute()
+        commit = commit or helpers.get_git_commit(dir_path)
+        key = hash_data([self.settings_key, str(dir_path), commit])
+        return self.cache_dir / f"{key}.json"
+
+    def load(self, dir_path, commit=None):
+        """Return the index of a directory at a commit, without checking it is current."""
+        entry_path = self._entry_path(dir_path, commit)
+        try:
+            entry = json.loads(entry_path.read_text())
+        except (OSError, ValueError):
+            return None
+        _touch(entry_path)
+        return entry
+
+    def get(self, dir_path, test_files):
+        """Return the index of a directory if nothing it was built from has changed."""
+        if entry := self.load(dir_path):
+            return self.current(dir_path, entry, test_files)
+
+    @staticmethod
+    def current(dir_path, entry, test_files):
+        """Return a loaded index if nothing it was built from has changed."""
+        if entry["test_files"] != sorted(str(Path(path).absolute()) for path in test_files):
+            logger.debug(f"Code index for {dir_path} is stale; test files were added or removed")
+            return None
+        for file_path, file_hash in entry["files"].items():
+            if hash_file(file_path) != file_hash:
+                logger.debug(f"Code index for {dir_path} is stale; {file_path} changed")
+                return None
+        return entry
+
+    def put(self, dir_path, test_files, entity_methods, results):
+        """Store the results of parsing a directory for the given entities.
+
+        The results are {test file: {"functions": [...], "dependencies": [...],
+        "unresolved": [...]}}, keyed by absolute path, with every other file the test
+        file's results used and every import they couldn't find.
+        """
+        source_files = set(results)
+        for result in results.values():
+            source_files.update(result["dependencies"])
+        files = {path: hash_file(path) for path in sorted(source_files)}
+        tokens = set()
+        for file_path in files:
+            try:
+                tokens.update(IDENTIFIER.findall(Path(file_path).read_text(errors="ignore")))
+            except OSError:
+                continue
+        entry = {
+            "test_files": sorted(str(Path(path).absolute()) for path in test_files),
+            "entity_methods": entity_methods,
+            "files": files,
+            "tokens": sorted(tokens),
+            "results": results,
+        }
+        _atomic_write(self._entry_path(dir_path), json.dumps(entry))
@@ -0,0 +1,83 @@
+"""Transitive coverage of methods, following the calls between them."""
+from plinko.features import FeatureTable
+
+
+class CallGraph:
+    """Compute what every method covers, directly or through the methods it calls.
+
+    Methods calling each other, directly or through others, form a strongly
+    connected component and so all cover the same things. Components are found
+    with an iterative version of Tarjan's algorithm, which finishes a component
+    only after every component it calls. So each component's coverage is built
+    once, from its own methods and its already finished callees, as a bitset
+    of the features in the FeatureTable.
+
+    A method is part of the graph if its entry in the method dict has covers.
+    Calls to anything else are unresolved and ignored.
+    """
+
+    def __init__(self, method_dict):
+        self.method_dict = method_dict
+        self._coverage = {}  # {method name: coverage bitset of its component}
+        self._features = {}  # {coverage bitset: the features in it}
+
+    def _is_resolved(self, name):
+        return getattr(self.method_dict.get(name), "covers", None) is not None
+
+    def _calls(self, name):
+        return [call for call in self.method_dict[name].calls if self._is_resolved(call)]
+
+    def coverage(self, method):
+        """Return everything a method covers, or None if it is unresolved."""
+        if not self._is_resolved(method):
+            return None
+        if method not in self._coverage:
+            self._condense(method)
+        coverage = self._coverage[method]
+        if coverage not in self._features:
+            self._features[coverage] = FeatureTable.features(coverage)
+        return set(self._features[coverage])
+
+    def _condense(self, root):
+        """Find every component reachable from a method, computing their coverage."""
+        index = {root: 0}  # {method name: visit order}
+        lowlink = {root: 0}  # {method name: earliest visited method it reaches}
+        stack, on_stack = [root], {root}
+        work = [(root, iter(self._calls(root)))]
+        while work:
+            method, calls = work[-1]
+            for call in calls:
+                if call in self._coverage:
+                    continue  # part of an already finished component
+                if call not in index:
+                    index[call] = lowlink[call] = len(index)
+                    stack.append(call)
+                    on_stack.add(call)
+                    work.append((call, iter(self._calls(call))))
+                    break
+                if call in on_stack:
+                    lowlink[method] = min(lowlink[method], index[call])
+            else:
+                # every call has been followed
+                work.pop()
+                if work:
+                    caller = work[-1][0]
+                    lowlink[caller] = min(lowlink[caller], lowlink[method])
+                if lowlink[method] == index[method]:
+                    self._finish_component(method, stack, on_stack)
+
+    def _finish_component(self, root, stack, on_stack):
+        """Pop a component off the stack and give all its methods their coverage."""
+        component = []
+        while (member := stack.pop()) != root:
+            component.append(member)
+        component.append(root)
+        on_stack.difference_update(component)
+        coverage = 0
+        for member in component:
+            coverage |= FeatureTable.mask(self.method_dict[member].covers)
+            for call in self._calls(member):
+                if call in self._coverage:
+                    coverage |= self._coverage[call]
+        for member in component:
+            self._coverage[member] = coverage
@@ -10,26 +10,44 @@ This class must provide the following data attributes:
   tests - To export a list of tests in the file
   methods - To export a list of methods and what they cover and link to
 """
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+import logging
 from pathlib import Path
+import re
 
 from logzero import logger
 
 from plinko import helpers
+from plinko.cache import CodeIndex, ParseCache, hash_data
 from plinko.config import settings
-from plinko.parsers import python_parser
-from plinko.parsers.pytest_tools import FixtureHandler
+from plinko.entity_matcher import EntityMatcher
+from plinko.features import FeatureTable
+from plinko.parsers import python_parser, source_finder
+from plinko.parsers.diff_scope import DiffScope
+from plinko.parsers.python_importer import ImportManager
+from plinko.parsers.pytest_tools import FixtureGraph, FixtureHandler
+from plinko.parsers.source_cache import SourceCache
+from plinko.results import ResultStream
 
 PARSED_FILES = []  # This global will help to reduce multiplication of effort
+UNRESOLVED = []  # imports that couldn't be found, collected like PARSED_FILES
+_WORKER_PARSER = None  # each pool worker process keeps its own CodeParser
+TEST_DEFINITION = re.compile(rb"def\s+test_")
 
 
 class CodeParser:
     imports = {}
 
     def __init__(self, **kwargs):
+        self._kwargs = kwargs  # used to recreate this parser in worker processes
         self.ent_meth_dict = kwargs.get("entity_methods")
-        helpers.write_to_file(
-            self.ent_meth_dict, "ent_meth_dict.txt", "entity method dict"
-        )
+        # only worth the time when debugging
+        if kwargs.get("dump_entities", logger.isEnabledFor(logging.DEBUG)):
+            helpers.write_to_file(
+                self.ent_meth_dict, "ent_meth_dict.txt", "entity method dict"
+            )
         logger.debug(f"Got ent_meth_dict: {self.ent_meth_dict}")
         self.tracked_items = {}
         self.project_root = Path(kwargs.get("project_root", settings.project_root))
@@ -37,10 +55,48 @@ class CodeParser:
             "create_on_instance", settings.create_on_instance
         )
         self.max_depth = kwargs.get("max_depth", settings.max_depth)
+        self.search_aggressiveness = kwargs.get(
+            "search_aggressiveness", settings.search_aggressiveness
+        )
+        self.jobs = kwargs.get("jobs", settings.get("jobs", 1))
+        self.prune = kwargs.get("prune", settings.get("prune_analysis", False))
         self.PyParser = python_parser.CodeParser
         self.fixture_handler = FixtureHandler
         self.fixture_handler._main_parser = self
-        # additional setup
+        self.cov_tests = {}  # {test_name: [coverage]}
+        self.miss_tests = []  # [test_name]
+        self.all_methods = {}  # {file: {full_name: FunctionSummary}}
+        self.file_dependencies = {}  # {test file: [every other file its results used]}
+        self.file_unresolved = {}  # {test file: [imports its results couldn't find]}
+        self._new_modules = []  # modules added since the stored results, see update_results
+        self.skipped = 0  # files the prefilter found can't hold any tests
+        self.analysis_settings = {
+            "max_depth": self.max_depth,
+            "search_aggressiveness": self.search_aggressiveness,
+            "create_on_instance": self.create_on_instance,
+            "class_name_style": settings.class_name_style,
+            "project_root": str(self.project_root.absolute()),
+            "prune": self.prune,
+        }
+        self.use_cache = kwargs.get("use_cache", settings.get("parse_cache", True))
+        # when streaming, each file's tests are written out instead of kept in all_methods
+        self.stream = None
+        if stream_path := kwargs.get("stream"):
+            self.stream = ResultStream(stream_path)
+        self.index = None
+        # the code index stores the results of a whole directory, for any later diff,
+        # so it can't be streamed or pruned to this diff
+        if (
+            not self.stream
+            and not self.prune
+            and kwargs.get("use_index", settings.get("code_index", True))
+        ):
+            self.index = CodeIndex(self.analysis_settings)
+        self._set_entities(self.ent_meth_dict)
+
+    def _set_entities(self, entity_methods):
+        """Set up everything that depends on the entities being searched for."""
+        self.ent_meth_dict = self._kwargs["entity_methods"] = entity_methods
         # keep this map to track old and newly formatted entity names
         self.entity_map = {
             helpers.normalize_text(ent, settings.class_name_style): ent
@@ -48,44 +104,487 @@ class CodeParser:
         }
         self.entities = list(self.entity_map.keys())
         logger.debug(f"Known entities: {self.entities}")
-        self.cov_tests = {}  # {test_name: [coverage]}
-        self.miss_tests = []  # [test_name]
-        self.all_methods = {}  # {file: {methods}}
+        self.entity_matcher = EntityMatcher(self.entities, self.search_aggressiveness)
+        self.parsed_entities = self.entities  # the entities all_methods was parsed for
+        self.diff_scope = None
+        if self.prune:
+            self.diff_scope = DiffScope(
+                self.ent_meth_dict, self.entity_matcher, settings.class_name_style
+            )
+        # module summaries depend on the entities and settings they were built with
+        ImportManager.module_summaries.clear()
+        self.cache = None
+        if self.use_cache:
+            # only pruning reads the methods, otherwise results hold for any methods
+            entities = self.ent_meth_dict if self.prune else sorted(self.entities)
+            self.cache = ParseCache({"entities": hash_data(entities), **self.analysis_settings})
 
-    def _parse_file(self, file_path, original_path=None):
-        if file_path.suffix == ".py":
+    @contextmanager
+    def _file_scope(self):
+        """Parse a top-level file against a clean copy of the shared parser state.
+
+        Helper modules and imports resolved for one test file must not leak into
+        the next, otherwise a file's results would depend on what was parsed before it.
+        Yields two lists, filled with every file parsed within the scope and every
+        import that couldn't be found.
+        """
+        baseline, unresolved_baseline = PARSED_FILES[:], UNRESOLVED[:]
+        import_state = ImportManager.snapshot()
+        parsed, unresolved = [], []
+        try:
+            yield parsed, unresolved
+        finally:
+            parsed.extend(PARSED_FILES[len(baseline) :])
+            unresolved.extend(UNRESOLVED[len(unresolved_baseline) :])
+            PARSED_FILES[:] = baseline
+            UNRESOLVED[:] = unresolved_baseline
+            ImportManager.restore(import_state)
 
+    def _analyze_file(self, file_path):
+        """Parse a single file, returning its function summaries, every file it used
+        and every import it couldn't find."""
+        with self._file_scope() as (parsed_files, unresolved):
             parser = self.PyParser(code_file=file_path, parent_parser=self)
+            parser.parse()
+        # nothing refers to the file's functions or syntax tree once summarized
+        self.fixture_handler.graph.forget_module(file_path)
+        SourceCache.release(file_path)
+        # the same Function may be stored under more than one name
+        functions = {
+            id(func): func
+            for func in parser.methods.values()
+            if isinstance(func, python_parser.Function)
+        }
+        # discovery order follows set iteration, which varies between processes
+        functions = sorted(
+            functions.values(),
+            key=lambda func: (func.location, func.lineno, func.full_name),
+        )
+        summaries = [
+            python_parser.FunctionSummary.from_function(
+                func, self.diff_scope and self.diff_scope.holds
+            )
+            for func in functions
+        ]
+        return summaries, parsed_files, unresolved
+
+    def _set_dependencies(self, file_path, dependencies, unresolved):
+        file_path = Path(file_path).absolute()
+        self.file_dependencies[str(file_path)] = sorted(
+            {str(Path(dep).absolute()) for dep in dependencies} - {str(file_path)}
+        )
+        self.file_unresolved[str(file_path)] = sorted(set(unresolved))
+
+    def _store_results(self, file_path, summaries, parsed_files, unresolved):
+        # files are listed again each time they are used, so only look at each once
+        dependencies = list(
+            dict.fromkeys(map(str, [*parsed_files, *self.fixture_handler.files_for(file_path)]))
+        )
+        self._set_dependencies(file_path, dependencies, unresolved)
+        if self.cache:
+            self.cache.put(
+                file_path,
+                [summary.to_dict() for summary in summaries],
+                dependencies=dependencies,
+                unresolved=sorted(set(unresolved)),
+            )
+        self._add_results(file_path, summaries)
+
+    def _get_cached(self, file_path):
+        # a conftest added since the results were cached is missing from their dependencies
+        if self.cache and (
+            cached := self.cache.get_entry(
+                file_path, required=self.fixture_handler.files_for(file_path)
+            )
+        ):
+            unresolved = cached.get("unresolved", [])
+            if any(_may_resolve(module, unresolved) for module in self._new_modules):
+                logger.debug(f"Cache entry for {file_path} is stale; a new module may resolve it")
+                return None
+            logger.debug(f"Using cached results for {file_path}")
+            self._set_dependencies(file_path, cached["dependencies"], unresolved)
+            return [python_parser.FunctionSummary.from_dict(func) for func in cached["data"]]
+
+    def _skip(self, file_path):
+        """Skip a file without tests, checking its raw bytes instead of parsing it.
+
+        Only functions named test_ in files named test_ are tests, and nothing but
+        tests end up in the reports. A skipped file still gets its empty results,
+        so the code index keeps track of it.
+        """
+        try:
+            if file_path.name.startswith("test_") and SourceCache.get(file_path).search(
+                TEST_DEFINITION
+            ):
+                return False
+        except OSError:
+            return False  # left for the parser to report
+        self.skipped += 1
+        self._set_dependencies(file_path, [], [])
+        return True
+
+    def _parse_file(self, file_path, original_path=None):
+        if file_path.suffix != ".py":
+            return
+        if self._skip(file_path):
+            self._add_results(file_path, [])
+        elif (summaries := self._get_cached(file_path)) is not None:
+            self._add_results(file_path, summaries)
         else:
+            self._store_results(file_path, *self._analyze_file(file_path))
+
+    def _worker_state(self):
+        """Return what a worker process needs to start from the state files are parsed against."""
+        return (
+            {
+                **self._kwargs,
+                "use_cache": False,
+                "use_index": False,
+                "stream": None,
+                "jobs": 1,
+                "dump_entities": False,
+            },
+            {
+                scope: {
+                    name: python_parser.FunctionSummary.from_function(fixture)
+                    for name, fixture in fixtures.items()
+                }
+                for scope, fixtures in self.fixture_handler.graph.scopes.items()
+            },
+            self.fixture_handler.source_files,
+            PARSED_FILES,
+            ImportManager.registrations(),
+        )
+
+    def _parse_files_parallel(self, file_paths):
+        """Fan files out to a pool of worker processes, handling results in file order.
+
+        Workers start from the same state every file is parsed against serially:
+        the already parsed fixtures, the files parsed while finding them and the
+        imports they registered. Each worker then keeps its own import caches.
+        Files are checked against the parse cache as they are reached, and only a
+        few files per worker are held waiting for the results of earlier ones.
+        """
+        window = deque()  # [(file path, cached summaries or a Future)], in file order
+        max_window, submitted = self.jobs * 4, 0
+        with ProcessPoolExecutor(
+            max_workers=self.jobs, initializer=_init_worker, initargs=self._worker_state()
+        ) as executor:
+            for path in file_paths:
+                if path.suffix != ".py":
+                    continue
+                if self._skip(path):
+                    result = []
+                elif (result := self._get_cached(path)) is None:
+                    result = executor.submit(_parse_in_worker, path)
+                    submitted += 1
+                window.append((path, result))
+                while window and (
+                    len(window) > max_window
+                    or not isinstance(window[0][1], Future)
+                    or window[0][1].done()
+                ):
+                    self._add_parallel_result(*window.popleft())
+            while window:
+                self._add_parallel_result(*window.popleft())
+        if submitted:
+            logger.info(f"Parsed {submitted} files with {self.jobs} processes")
+
+    def _add_parallel_result(self, file_path, result):
+        if isinstance(result, Future):
+            summaries, parsed_files, unresolved = result.result()
+            summaries = [python_parser.FunctionSummary.from_dict(summ) for summ in summaries]
+            self._store_results(file_path, summaries, parsed_files, unresolved)
+        else:
+            self._add_results(file_path, result)
+
+    def _add_results(self, file_path, summaries):
+        """Put all the tests into one large list and all the methods into one large dict.
+
+        When streaming, the file's tests are written out and nothing is kept.
+        """
+        if self.stream:
+            self.stream.write(file_path, summaries)
+            self.file_dependencies.pop(str(Path(file_path).absolute()), None)
+            self.file_unresolved.pop(str(Path(file_path).absolute()), None)
+            SourceCache.discard(file_path)
             return
-        parser.parse()
-        # rel_path = file_path.relative_to(original_path)
-        # put all the tests into one large list
-        # put all the methods into one large dict
-        parser._match_fixtures()
-        for func_path, func_obj in parser.methods.items():
-            if func_obj.is_test:
-                if "module_org" in func_obj.args:
-                    pass
-                if func_obj.covers:
-                    self.cov_tests[func_path] = func_obj.covers
+        self.all_methods[str(file_path)] = {summ.full_name: summ for summ in summaries}
+        for summary in summaries:
+            if summary.is_test:
+                if summary.covers:
+                    self.cov_tests[summary.full_name] = summary.covers
                 else:
-                    self.miss_tests.append(func_path)
+                    self.miss_tests.append(summary.full_name)
 
     def parse_directory(self, dir_path, original_path=None):
         dir_path = Path(dir_path)
+        if self.index and not original_path:
+            self._parse_indexed(dir_path)
+        else:
+            self._parse_tree(dir_path, original_path)
+
+    def _parse_tree(self, dir_path, original_path=None, files=None):
+        """Parse the test files in a directory, or only the given ones."""
+        if files is None:
+            files = self._iter_test_files(dir_path)
         if not original_path:
             original_path = dir_path
             # todo: This assumes python and pytest
             self.fixture_handler.find_fixture_files(dir_path)  # uses root dir path
             logger.debug(f"Found fixture files: {self.fixture_handler._pending_files.keys()}")
             self.fixture_handler.parse_pending()
-            logger.debug(f"Found fixtures: {self.fixture_handler.fixtures}")
-        if dir_path.is_dir():
-            for item in helpers.recurse_down(dir_path, ".py"):
+            logger.debug(f"Found fixtures: {self.fixture_handler.graph.scopes}")
+        if dir_path.is_dir() and self.jobs > 1:
+            self._parse_files_parallel(files)
+        else:
+            for item in files:
                 self._parse_file(item, original_path)
+        logger.info(f"Prefilter: skipped {self.skipped} files without tests")
+        if self.cache:
+            logger.info(
+                f"Parse cache: {self.cache.hits} hits, {self.cache.misses} misses"
+            )
+
+    def _in_index(self, entry, entities):
+        """Return those of some normalized entities that appear in the indexed code."""
+        return set(
+            EntityMatcher(entities, self.search_aggressiveness).find("\n".join(entry["tokens"]))
+        )
+
+    def _index_covers(self, entry):
+        """Check that every entity appearing in the indexed code was indexed."""
+        indexed = {
+            helpers.normalize_text(ent, settings.class_name_style)
+            for ent in entry["entity_methods"]
+        }
+        return indexed.issuperset(self._in_index(entry, self.entities))
+
+    def _extend_index(self, entry, requested):
+        """Parse for the requested entities and those indexed that can still matter.
+
+        An indexed entity that doesn't appear in the indexed code can't change
+        any results, so it isn't carried over. The index then only ever holds
+        the entities of the latest diff and those its code mentions.
+        """
+        names = {
+            ent: helpers.normalize_text(ent, settings.class_name_style)
+            for ent in entry["entity_methods"]
+        }
+        present = self._in_index(entry, list(dict.fromkeys(names.values())))
+        kept = {
+            ent: methods
+            for ent, methods in entry["entity_methods"].items()
+            if names[ent] in present
+        }
+        self._set_entities(helpers.merge_diff_dicts([kept, requested]))
+
+    @staticmethod
+    def _iter_test_files(dir_path):
+        """Yield the test files of a directory as they are found, or a single test file."""
+        if not dir_path.is_dir():
+            return iter([dir_path])
+        return helpers.recurse_down(dir_path, ".py", include=settings.get("include_files", []))
+
+    @classmethod
+    def _test_files(cls, dir_path):
+        return list(cls._iter_test_files(dir_path))
+
+    def _load_result(self, file_path, result):
+        """Add the stored results of a test file, as kept in the code index."""
+        self.all_methods[str(file_path)] = {
+            summ["full_name"]: python_parser.FunctionSummary.from_dict(summ)
+            for summ in result["functions"]
+        }
+        self.file_dependencies[str(Path(file_path).absolute())] = result["dependencies"]
+        self.file_unresolved[str(Path(file_path).absolute())] = result.get("unresolved", [])
+
+    def _index_results(self):
+        """Return the results of every parsed test file, in the code index format."""
+        results = {}
+        for file_path, summaries in self.all_methods.items():
+            file_path = str(Path(file_path).absolute())
+            results[file_path] = {
+                "functions": [summary.to_dict() for summary in summaries.values()],
+                "dependencies": self.file_dependencies.get(file_path, []),
+                "unresolved": self.file_unresolved.get(file_path, []),
+            }
+        return results
+
+    def _parse_indexed(self, dir_path):
+        """Take the results from the stored code index, parsing only when it falls short.
+
+        The test files are only listed up front to check a stored index. Without
+        one, they are parsed as the walk finds them and recorded for the new index.
+        """
+        requested = self.ent_meth_dict
+        if stored := self.index.load(dir_path):
+            files = test_files = self._test_files(dir_path)
+            entry = self.index.current(dir_path, stored, test_files)
         else:
-            self._parse_file(dir_path, original_path)
+            test_files, entry = [], None
+            files = self._recorded(self._iter_test_files(dir_path), test_files)
+        if entry and self._index_covers(entry):
+            logger.info(f"Using the code index for {dir_path}")
+            self.parsed_entities = [
+                helpers.normalize_text(ent, settings.class_name_style)
+                for ent in entry["entity_methods"]
+            ]
+            for file_path, result in entry["results"].items():
+                self._load_result(file_path, result)
+        else:
+            if entry:
+                # parse for the indexed entities too, so the index keeps covering them
+                self._extend_index(entry, requested)
+            self._parse_tree(dir_path, files=files)
+            self.index.put(dir_path, test_files, self.ent_meth_dict, self._index_results())
+        self.cov_tests, self.miss_tests = self.project(requested)
+
+    @staticmethod
+    def _recorded(files, record):
+        """Yield files as they are found, adding each to a record as it goes."""
+        for file_path in files:
+            record.append(file_path)
+            yield file_path
+
+    def parse_changes(self, dir_path, base_ref=None, changed_paths=()):
+        """Parse only the test files affected by changes since a previous indexed run.
+
+        The previous results come from the code index stored for the base ref's
+        commit, or for the current commit if only changed paths are given. A test
+        file is parsed again if it, or any file its results used, changed since,
+        if a conftest above it was added or removed, or if a new module may be what
+        one of the imports it couldn't find points to. Everything else keeps its
+        stored results, and the merged results are indexed for the current commit. Without a usable stored index, or if the
+        entities being searched for appear in code it wasn't built for, the whole
+        directory is parsed.
+        """
+        if self.stream or self.prune:
+            raise ValueError(
+                "Changes are merged into the code index, which can't be streamed or pruned"
+            )
+        dir_path = Path(dir_path)
+        self.index = self.index or CodeIndex(self.analysis_settings)
+        changed = {str(Path(path).absolute()) for path in changed_paths}
+        entry = None
+        if base_ref:
+            since_ref = helpers.get_changed_files(dir_path, base_ref)
+            if since_ref is not None:
+                changed.update(map(str, since_ref))
+                entry = self.index.load(dir_path, helpers.get_git_commit(dir_path, base_ref))
+        else:
+            entry = self.index.load(dir_path)
+        if not entry or not self._index_covers(entry):
+            logger.warning(f"No usable code index to update; parsing all of {dir_path}")
+            return self._parse_indexed(dir_path)
+        requested = self.ent_meth_dict
+        # entities new to the index can only appear in the changed files
+        self._extend_index(entry, requested)
+        test_files = self.update_results(dir_path, entry["results"], changed)
+        self.index.put(dir_path, test_files, self.ent_meth_dict, self._index_results())
+        self.cov_tests, self.miss_tests = self.project(requested)
+
+    @staticmethod
+    def _new_files(stored, changed):
+        """Split the changed modules no stored result used into conftests and others.
+
+        These were added, removed or not used before. A conftest changes the
+        fixtures of every test beneath it. Any other module that exists, apart
+        from test modules, may be where an import that didn't resolve before is
+        now found, which _may_resolve narrows down for each test file.
+        """
+        used = set(stored)
+        for result in stored.values():
+            used.update(result["dependencies"])
+        conftests, modules = [], []
+        for path in map(Path, changed - used):
+            if path.name == "conftest.py":
+                conftests.append(path.parent)
+            elif path.suffix == ".py" and not path.name.startswith("test_") and path.exists():
+                modules.append(path)
+        return conftests, modules
+
+    def update_results(self, dir_path, stored, changed):
+        """Combine stored results with fresh ones for the test files affected by changes.
+
+        The stored results are in the code index format, and changed holds absolute
+        paths. Returns every current test file.
+        """
+        test_files = self._test_files(dir_path)
+        conftests, modules = self._new_files(stored, changed)
+        affected = [
+            path
+            for path in test_files
+            if (key := str(path.absolute())) not in stored
+            or key in changed
+            or not changed.isdisjoint(stored[key]["dependencies"])
+            or any(path.absolute().is_relative_to(scope) for scope in conftests)
+            or any(_may_resolve(module, stored[key].get("unresolved", ())) for module in modules)
+        ]
+        logger.info(f"{len(affected)} of {len(test_files)} test files affected by changes")
+        self.all_methods, self.file_dependencies, self.file_unresolved = {}, {}, {}
+        if self.cache:
+            self.cache.forget_hashes()
+        # nor can cached results know about the new modules
+        self._new_modules = modules
+        try:
+            if affected:
+                self._parse_tree(dir_path, files=affected)
+        finally:
+            self._new_modules = []
+        fresh, self.all_methods = self.all_methods, {}
+        for path in test_files:
+            if str(path) in fresh:
+                self.all_methods[str(path)] = fresh[str(path)]
+            elif (key := str(path.absolute())) in stored:
+                self._load_result(path, stored[key])
+        self.cov_tests, self.miss_tests = self.project(self.ent_meth_dict)
+        return test_files
+
+    def project(self, entity_methods):
+        """Return the covered and missed tests as if only these entities were known.
+
+        Coverage is attributed to the entity that starts it, so the results for a
+        subset of the parsed entities are those results minus the other entities.
+        """
+        excluded = self._excluded(entity_methods)
+        return self._project_tests(
+            (
+                (summary.full_name, summary.covers)
+                for summaries in self.all_methods.values()
+                for summary in summaries.values()
+                if summary.is_test
+            ),
+            excluded,
+        )
+
+    def project_stream(self, entity_methods):
+        """Yield the covered and missed tests of each streamed test file, as project would."""
+        excluded = self._excluded(entity_methods)
+        for record in self.stream.records():
+            yield self._project_tests(record["tests"].items(), excluded)
+
+    def _excluded(self, entity_methods):
+        entities = {
+            helpers.normalize_text(ent, settings.class_name_style) for ent in entity_methods
+        }
+        return set(self.parsed_entities) - entities
+
+    @staticmethod
+    def _project_tests(tests, excluded):
+        """Split (test name, coverage) pairs into covered and missed tests, less excluded entities."""
+        cov_tests, miss_tests = {}, []
+        for name, covers in tests:
+            covers = {
+                cov
+                for cov in map(FeatureTable.intern, covers)
+                if FeatureTable.entity(cov) not in excluded
+            }
+            if covers:
+                cov_tests[name] = covers
+            else:
+                miss_tests.append(name)
+        return cov_tests, miss_tests
 
     def get_missing_coverage(self):
         """Parse through all known coverage and determine what is missing.
@@ -93,3 +592,42 @@ class CodeParser:
         todo: write what is needed to get the missing coverage
         """
         pass
+
+
+def _may_resolve(module, unresolved):
+    """Check whether a module could be what one of some imports that weren't found points to.
+
+    An import is only ever found at a path built from the parts of its dotted name.
+    """
+    name = module.parent.name if module.name == "__init__.py" else module.stem
+    return any(name in import_name.split(".") for import_name in unresolved)
+
+
+def reset_parse_state():
+    """Forget the fixtures, imports, files and features found by earlier parsing.
+
+    Needed before parsing again in a long running process, once files may have changed.
+    """
+    PARSED_FILES.clear()
+    UNRESOLVED.clear()
+    FixtureHandler.reset()
+    FeatureTable.reset()  # after the fixture graph, which kept the only lasting bitsets
+    ImportManager.reset()
+    source_finder.clear_finders()
+
+
+def _init_worker(parser_kwargs, fixtures, fixture_files, parsed_files, registrations):
+    """Recreate the parent's post-fixture-discovery state in a worker process."""
+    global _WORKER_PARSER
+    _WORKER_PARSER = CodeParser(**parser_kwargs)
+    FixtureHandler.graph = FixtureGraph(fixtures)
+    FixtureHandler.source_files = fixture_files
+    PARSED_FILES[:] = parsed_files
+    for import_name, registration in registrations.items():
+        ImportManager.register(import_name, *registration)
+
+
+def _parse_in_worker(file_path):
+    """Parse a file in a worker process, returning picklable results."""
+    summaries, parsed_files, unresolved = _WORKER_PARSER._analyze_file(file_path)
+    return [summary.to_dict() for summary in summaries], parsed_files, unresolved
@@ -1,82 +1,168 @@
 """Base command for Plinko."""
+import json
+from pathlib import Path
+
 import click
 from logzero import logger
 
-from plinko import code_parser, helpers, logger as plog
+from plinko import code_parser, helpers, logger as plog, results, server
+from plinko.cache import evict
 from plinko.config import PLINKO_DATA_DIR, settings
 
 
-@click.command()
-@click.option(
+clix_diff_option = click.option(
     "--clix-diff",
-    help="Path to a clix compact diff file.",
+    help="Path to a clix compact diff file. Can be given more than once.",
     type=click.Path(exists=True, dir_okay=False),
+    multiple=True,
 )
-@click.option(
+apix_diff_option = click.option(
     "--apix-diff",
-    help="Path to an apix compact diff file.",
+    help="Path to an apix compact diff file. Can be given more than once.",
     type=click.Path(exists=True, dir_okay=False),
+    multiple=True,
 )
-@click.option(
+test_directory_option = click.option(
     "--test-directory",
     help="Path to the directory that contains your tests.",
     type=click.Path(exists=True, dir_okay=True),
-    prompt=True,
 )
-@click.option(
+behavior_option = click.option(
     "--behavior",
     help="How Plinko should limit returned tests.",
     type=click.Choice(["all", "no-dupes", "minimal"]),
     default=settings.behavior,
 )
-@click.option(
+depth_option = click.option(
     "--depth",
     help="Max depth of recursive method resolutions.",
     type=click.IntRange(0, 20),
     default=settings.max_depth,
 )
-@click.option(
+search_aggressiveness_option = click.option(
     "--search-aggressiveness",
     help="Specify how aggressively Plinko should search for entity names.",
     type=click.Choice(["low", "med", "high"]),
     default=settings.search_aggressiveness,
 )
-@click.option(
+name_option = click.option(
     "--name",
     help="The name of your project.",
     type=str,
-    prompt=True,
+)
+cache_option = click.option(
+    "--cache/--no-cache",
+    help="Reuse stored parse results for files that haven't changed.",
+    default=settings.get("parse_cache", True),
+)
+index_option = click.option(
+    "--index/--no-index",
+    help="Reuse the stored results of this test directory, if they cover the diffs.",
+    default=settings.get("code_index", True),
+)
+jobs_option = click.option(
+    "--jobs",
+    help="Number of processes used to parse test files.",
+    type=click.IntRange(1),
+    default=settings.get("jobs", 1),
+)
+socket_option = click.option(
+    "--socket",
+    "socket_path",
+    help="Path of the Unix socket the analysis server listens on.",
+    type=click.Path(dir_okay=False),
+    default=str(server.SOCKET_PATH),
+)
+
+
+@click.group(invoke_without_command=True)
+@clix_diff_option
+@apix_diff_option
+@test_directory_option
+@behavior_option
+@depth_option
+@search_aggressiveness_option
+@name_option
+@cache_option
+@index_option
+@click.option(
+    "--since",
+    help="Only parse tests affected by changes since this git ref, reusing its code index.",
+    type=str,
+)
+@click.option(
+    "--changed",
+    help="A file changed since the last indexed run. Only tests affected by changes are "
+    "parsed. Can be given more than once.",
+    type=click.Path(),
+    multiple=True,
+)
+@jobs_option
+@click.option(
+    "--stream/--no-stream",
+    help="Write each test file's results out as soon as it is parsed, keeping memory use "
+    "flat. Reports are written as JSON lines.",
+    default=settings.get("stream_results", False),
+)
+@click.option(
+    "--prune/--no-prune",
+    help="Skip helper modules that can't reach the diffs' entities, and report only the "
+    "diffs' features.",
+    default=settings.get("prune_analysis", False),
 )
 @click.option("--log-level", help="Log level", default=settings.log_level)
+@click.pass_context
 def cli(
-    clix_diff, apix_diff, test_directory, behavior, depth, search_aggressiveness, name, log_level
+    ctx,
+    clix_diff,
+    apix_diff,
+    test_directory,
+    behavior,
+    depth,
+    search_aggressiveness,
+    name,
+    cache,
+    index,
+    since,
+    changed,
+    jobs,
+    stream,
+    prune,
+    log_level,
 ):
     plog.setup_logzero(log_level.lower())
-    def run_reports(interface, diff_path):
-        """Run the reports for the given interface and diff file."""
+    if ctx.invoked_subcommand:
+        return
+    # only prompt when running the analysis, not for the subcommands
+    test_directory = test_directory or click.prompt(
+        "Test directory", type=click.Path(exists=True, dir_okay=True)
+    )
+    name = name or click.prompt("Name", type=str)
+
+    def write_reports(interface, diff_path, parser):
+        """Write the reports for the given interface and diff file."""
         product_ver = helpers.get_version(diff_path)
-        diff_dict = helpers.get_diff_dict(diff_path, flatten=False)
-        helpers.del_from_iter(name, diff_dict)
-        parser = code_parser.CodeParser(
-            entity_methods=diff_dict,
-            max_depth=depth,
-            behavior=behavior,
-            search_aggressiveness=search_aggressiveness,
-        )
-        parser.parse_directory(test_directory)
+        if stream:
+            results.write_reports(
+                parser.project_stream(diff_dicts[diff_path]),
+                f"{PLINKO_DATA_DIR}/projects/{name}/{interface}/{product_ver}",
+                minimal=behavior == "minimal",
+            )
+            return
+        cov_tests, miss_tests = parser.project(diff_dicts[diff_path])
         helpers.write_to_file(
-            helpers.expand_dict_keys(parser.cov_tests),
+            helpers.expand_dict_keys(cov_tests),
             f"{PLINKO_DATA_DIR}/projects/{name}/{interface}/{product_ver}/test-coverage.yaml",
             "tests with coverage",
         )
         helpers.write_to_file(
-            parser.miss_tests,
+            miss_tests,
             f"{PLINKO_DATA_DIR}/projects/{name}/{interface}/{product_ver}/test-no-coverage.yaml",
             "tests without coverage",
         )
         if behavior == "minimal":
             helpers.write_to_file(
-                helpers.expand_dict_keys(helpers.get_min_tests(parser.cov_tests)),
+                helpers.expand_dict_keys(helpers.get_min_tests(cov_tests)),
                 f"{PLINKO_DATA_DIR}/projects/{name}/{interface}/{product_ver}/min-tests.yaml",
                 "minimal tests",
             )
@@ -85,12 +171,137 @@ def cli(
     if not test_directory:
         logger.warning("You must provide a test directory path.")
         return
-    if clix_diff:
-        run_reports("cli", clix_diff)
-    if apix_diff:
-        run_reports("api", apix_diff)
-    if not clix_diff and not apix_diff:
+    reports = [*(("cli", path) for path in clix_diff), *(("api", path) for path in apix_diff)]
+    if not reports:
         logger.error("You must provide a diff file.")
+        return
+    if stream and (since or changed):
+        raise click.UsageError("--since and --changed need the code index, which --stream skips.")
+    if prune and (since or changed):
+        raise click.UsageError("--since and --changed need the code index, which --prune skips.")
+    diff_dicts = {}
+    for _, diff_path in reports:
+        diff_dicts[diff_path] = helpers.get_diff_dict(diff_path, flatten=False)
+        helpers.del_from_iter(name, diff_dicts[diff_path])
+    # the tests are parsed once, knowing the entities of every diff
+    parser = code_parser.CodeParser(
+        entity_methods=helpers.merge_diff_dicts(diff_dicts.values()),
+        max_depth=depth,
+        behavior=behavior,
+        search_aggressiveness=search_aggressiveness,
+        use_cache=cache,
+        use_index=index,
+        jobs=jobs,
+        stream=stream and f"{PLINKO_DATA_DIR}/projects/{name}/results.jsonl",
+        prune=prune,
+    )
+    if since or changed:
+        parser.parse_changes(test_directory, base_ref=since, changed_paths=changed)
+    else:
+        parser.parse_directory(test_directory)
+    for interface, diff_path in reports:
+        write_reports(interface, diff_path, parser)
+    evict()
+
+
+@cli.command()
+@clix_diff_option
+@apix_diff_option
+@test_directory_option
+@depth_option
+@search_aggressiveness_option
+@name_option
+@cache_option
+@index_option
+@jobs_option
+@socket_option
+def serve(
+    clix_diff,
+    apix_diff,
+    test_directory,
+    depth,
+    search_aggressiveness,
+    name,
+    cache,
+    index,
+    jobs,
+    socket_path,
+):
+    """Keep the tests parsed in memory, answering queries sent with plinko query."""
+    test_directory = test_directory or click.prompt(
+        "Test directory", type=click.Path(exists=True, dir_okay=True)
+    )
+    name = name or click.prompt("Name", type=str)
+    state = server.AnalysisState(
+        test_directory,
+        name=name,
+        max_depth=depth,
+        search_aggressiveness=search_aggressiveness,
+        use_cache=cache,
+        use_index=index,
+        jobs=jobs,
+    )
+    if clix_diff or apix_diff:
+        # parse up front for the diffs given, so the first queries are fast too
+        try:
+            entity_methods = helpers.merge_diff_dicts(
+                state.diff_entities(diff_path) for diff_path in (*clix_diff, *apix_diff)
+            )
+        except ValueError as err:
+            raise click.ClickException(str(err))
+        state.refresh(entity_methods)
+    try:
+        analysis_server = server.AnalysisServer(state, socket_path)
+    except RuntimeError as err:
+        raise click.ClickException(str(err))
+    analysis_server.serve()
+
+
+@cli.command()
+@click.option(
+    "--diff",
+    help="Path to a clix or apix compact diff file, as seen by the server.",
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--feature",
+    help='A feature to find tests for, like "Host create". Can be given more than once.',
+    multiple=True,
+)
+@behavior_option
+@click.option("--status", help="Show what the server has parsed instead.", is_flag=True)
+@socket_option
+def query(diff, feature, behavior, status, socket_path):
+    """Ask a running analysis server which tests cover a diff or features."""
+    if status:
+        request = {"op": "status"}
+    elif diff or feature:
+        request = {
+            "op": "query",
+            "diff": diff and str(Path(diff).absolute()),
+            "features": list(feature),
+            "behavior": behavior,
+        }
+    else:
+        raise click.UsageError("Give a diff file, at least one feature or --status.")
+    click.echo(json.dumps(_send(request, socket_path), indent=2))
+
+
+@cli.command()
+@socket_option
+def stop(socket_path):
+    """Stop a running analysis server."""
+    _send({"op": "stop"}, socket_path)
+
+
+def _send(request, socket_path):
+    try:
+        response = server.send(request, socket_path)
+    except OSError as err:
+        raise click.ClickException(f"Unable to reach a server on {socket_path}: {err}")
+    if not response["ok"]:
+        raise click.ClickException(response["error"])
+    return response
 
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+"""Multi-pattern matching of known entity names in lines of code."""
+from plinko.helpers import gen_variants
+
+
+class EntityMatcher:
+    """Find every known entity in a line of code with a single pass over the line.
+
+    The patterns for all entities, and their naming variants, are compiled once
+    into an Aho-Corasick automaton. Matching then costs one transition per
+    character of the line, no matter how many entities are known.
+
+    Search aggressiveness controls which patterns an entity is matched by:
+      low - the entity name exactly as given
+      med - the entity name or one of its gen_variants
+      high - the same, but ignoring case entirely
+    """
+
+    def __init__(self, entities, aggressiveness="low"):
+        self.entities = list(entities)
+        self.aggressiveness = aggressiveness
+        self._fold_case = aggressiveness == "high"
+        self._goto = [{}]  # the trie of all patterns {char: state}
+        self._fail = [0]
+        self._found = [set()]  # entity indexes found when reaching each state
+        for index, entity in enumerate(self.entities):
+            for pattern in self._patterns(entity):
+                self._add_pattern(pattern, index)
+        self._transitions = self._compile()
+
+    def _patterns(self, entity):
+        """Return all the strings that count as a match for an entity."""
+        if self.aggressiveness == "low":
+            return {entity}
+        patterns = {entity, *gen_variants(entity)}
+        if self._fold_case:
+            return {pattern.lower() for pattern in patterns}
+        return patterns
+
+    def _add_pattern(self, pattern, index):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._found.append(set())
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._found[state].add(index)
+
+    def _compile(self):
+        """Link failure states and flatten the trie into a full transition table."""
+        transitions = [None] * len(self._goto)
+        transitions[0] = dict(self._goto[0])
+        queue = list(self._goto[0].values())
+        # states are visited breadth first, so a state's failure state is always done
+        for state in queue:
+            transitions[state] = dict(transitions[self._fail[state]])
+            for char, next_state in self._goto[state].items():
+                self._fail[next_state] = transitions[self._fail[state]].get(char, 0)
+                self._found[next_state] |= self._found[self._fail[next_state]]
+                transitions[state][char] = next_state
+                queue.append(next_state)
+        self._found = [tuple(sorted(found)) for found in self._found]
+        return transitions
+
+    def find(self, line):
+        """Return all known entities found in the line, in the order they were given."""
+        if self._fold_case:
+            line = line.lower()
+        transitions, found_at = self._transitions, self._found
+        state, found = 0, set()
+        for char in line:
+            state = transitions[state].get(char, 0)
+            if found_at[state]:
+                found.update(found_at[state])
+        return [self.entities[index] for index in sorted(found)]
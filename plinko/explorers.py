@@ -1,23 +1,133 @@
 """A collection of methods to assist in handling product explorers."""
+from pathlib import Path
+import re
+
+from logzero import logger
+
+from plinko.helpers import import_yaml, iter_flattened, normalize
+
+# the collected nodes, as pytest --collect-only shows them: <Module test_host.py>
+COLLECTED_NODE = re.compile(r"^(\s*)<(\w+) (.+)>\s*$")
+CONTAINERS = ("Dir", "Package")
+CLASSES = ("Class", "UnitTestCase")
+FUNCTIONS = ("Function", "TestCaseFunction")
+
+
+def _add_collected(pt_dict, file_name, test_class, test):
+    """Record a collected test, dropping any parameters, as {file: [tests]} or {file: {class: [tests]}}."""
+    test = test.split("[")[0]
+    if test_class:
+        tests = pt_dict.setdefault(file_name, {})
+        if isinstance(tests, list):  # the file has module level tests too
+            tests = pt_dict[file_name] = {None: tests}
+        tests = tests.setdefault(test_class, [])
+    elif isinstance(tests := pt_dict.setdefault(file_name, []), dict):
+        tests = tests.setdefault(None, [])
+    if test not in tests:
+        tests.append(test)
+
+
+def pyt_collect_to_dict(pt_export_path):
+    """Read the output of pytest --collect-only into {file: [tests]} or {file: {class: [tests]}}.
+
+    Both the tree pytest shows by default and the node ids shown with -q are read.
+    Module level tests in a file that also has classes are kept under a None class.
+    """
+    pt_dict = {}
+    stack = []  # [(indentation, node type, name)] enclosing the current line
+    with Path(pt_export_path).open() as pt_file:
+        for line in pt_file:
+            line = line.rstrip()
+            if "::" in line and not line.startswith(("<", " ")):
+                file_name, *test_class, test = line.split("::")
+                _add_collected(pt_dict, file_name, "::".join(test_class), test)
+                continue
+            if not (match := COLLECTED_NODE.match(line)):
+                continue
+            indent, node_type, name = len(match[1]), match[2], match[3]
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            stack.append((indent, node_type, name))
+            if node_type not in FUNCTIONS:
+                continue
+            module = [node for node in stack if node[1] == "Module"]
+            if not module:
+                continue
+            file_name = module[0][2]
+            if "/" not in file_name:
+                # newer versions show directories as nodes, the outermost being the rootdir
+                dirs = [node[2] for node in stack if node[1] in CONTAINERS][1:]
+                file_name = "/".join([*dirs, file_name])
+            test_class = "::".join(node[2] for node in stack if node[1] in CLASSES)
+            _add_collected(pt_dict, file_name, test_class, name)
+    return pt_dict
+
+
+def _name_key(name):
+    """Reduce a file, class or entity name to what they are matched on.
+
+    That is lowercase letters and digits, without a .py, a leading "test" or a
+    plural s, so "content_views", "test_contentview.py" and "TestContentView" agree.
+    """
+    key = re.sub(r"[^a-z0-9]", "", name.lower().removesuffix(".py")).removeprefix("test")
+    return key[:-1] if key.endswith("s") and not key.endswith("ss") else key
+
+
+class CollectionIndex:
+    """The tests of a pytest collection, indexed by the names they are matched on.
+
+    Every collected test is numbered. Tests are indexed by the names of their
+    file and classes, and by each word of their own name, so a diff entry is
+    answered by intersecting a few sets instead of checking every test.
+    """
+
+    def __init__(self, pt_dict):
+        self.tests = []  # [(file, class or None, test)], by number
+        self._by_name = {}  # {file or class name key: {test number}}
+        self._by_word = {}  # {word of a test name: {test number}}
+        for file_name, tests in pt_dict.items():
+            classes = tests.items() if isinstance(tests, dict) else [(None, tests)]
+            for test_class, class_tests in classes:
+                names = {_name_key(Path(file_name).name)}
+                if test_class:
+                    names.update(_name_key(name) for name in test_class.split("::"))
+                for test in class_tests:
+                    number = len(self.tests)
+                    self.tests.append((file_name, test_class, test))
+                    for name in names:
+                        self._by_name.setdefault(name, set()).add(number)
+                    for word in normalize(test):
+                        self._by_word.setdefault(word, set()).add(number)
+
+    def find(self, entity, words):
+        """Return the numbers of the tests named for an entity, with every word in their name."""
+        found = self._by_name.get(_name_key(entity), set())
+        for word in words:
+            if not found:
+                break
+            found = found & self._by_word.get(word, set())
+        return sorted(found)
+
+
+def find_test_match(entity, method, collection, interface="api"):
+    """Return the collected tests for a diff entry, grouped by file and class like the collection.
+
+    A test matches if its file or a class it is in is named for the entity, and
+    the method's first word (a cli subcommand's options are ignored) is in its name.
+    """
+    if not isinstance(collection, CollectionIndex):
+        collection = CollectionIndex(collection)
+    words = normalize(method.split()[0]) if method.split() else []
+    results = {}
+    for number in collection.find(entity, words):
+        _add_collected(results, *collection.tests[number])
+    logger.debug(f"{interface} {entity} {method} matched {results}")
+    return results
 
 
 def flatten_clix_diff(clix_diff):
-    compiled = []
-    if isinstance(clix_diff, dict):
-        for key in clix_diff:
-            for item in clix_diff[key]:
-                res = flatten_clix_diff(item)
-                if isinstance(res, list):
-                    for sub_item in res:
-                        compiled.append(f"{key} {sub_item}")
-                else:
-                    compiled.append(f"{key} {res}")
-    elif isinstance(clix_diff, list):
-        compiled = [flatten_clix_diff(item) for item in clix_diff]
-    else:
-        compiled = clix_diff
-    print(f"returning {compiled}")
-    return compiled
+    """Lazily yield a "command subcommand option" string for each change in a clix diff."""
+    return iter_flattened(clix_diff)
 
 
 def plink_clix(diff_path, pt_export_path):
@@ -29,16 +139,13 @@ def plink_clix(diff_path, pt_export_path):
     if not diff_dict or not pt_dict:
         print("something went wrong...")
         return
-    diff_dict = flatten_clix_diff(list(diff_dict.values()))[0]
-    print(diff_dict)
+    collection = CollectionIndex(pt_dict)  # built once, for every change in the diff
     plink_results = {"found": [], "missing": []}
-    for test in diff_dict:
-        print(f"test - {test}")
+    for test in flatten_clix_diff(next(iter(diff_dict.values()))):
         split_test = test.split()
         results = find_test_match(
-            split_test[1], " ".join(split_test[2:]), pt_dict, "cli"
+            split_test[1], " ".join(split_test[2:]), collection, "cli"
         )
-        print(results)
         if results:
             plink_results["found"].append([test, results])
         else:
@@ -47,22 +154,8 @@ def plink_clix(diff_path, pt_export_path):
 
 
 def flatten_apix_diff(apix_diff):
-    compiled = []
-    if isinstance(apix_diff, dict):
-        for key in apix_diff:
-            for item in apix_diff[key]:
-                res = flatten_apix_diff(item)
-                if isinstance(res, list):
-                    for sub_item in res:
-                        compiled.append(f"{key} {sub_item}")
-                else:
-                    compiled.append(f"{key} {res}")
-    elif isinstance(apix_diff, list):
-        compiled = [flatten_apix_diff(item) for item in apix_diff]
-    else:
-        compiled = apix_diff
-    print(f"returning {compiled}")
-    return compiled
+    """Lazily yield an "entity method" string for each change in an apix diff."""
+    return iter_flattened(apix_diff)
 
 
 def plink_apix(diff_path, pt_export_path):
@@ -74,16 +167,13 @@ def plink_apix(diff_path, pt_export_path):
     if not diff_dict or not pt_dict:
         print("something went wrong...")
         return
-    diff_dict = flatten_apix_diff(list(diff_dict.values()))[0]
-    print(diff_dict)
+    collection = CollectionIndex(pt_dict)  # built once, for every change in the diff
     plink_results = {"found": [], "missing": []}
-    for test in diff_dict:
-        print(f"test - {test}")
+    for test in flatten_apix_diff(next(iter(diff_dict.values()))):
         split_test = test.split()
         results = find_test_match(
-            split_test[0], " ".join(split_test[1:]), pt_dict, "api"
+            split_test[0], " ".join(split_test[1:]), collection, "api"
         )
-        print(results)
         if results:
             plink_results["found"].append([test, results])
         else:
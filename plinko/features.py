@@ -0,0 +1,54 @@
+"""Number the features tests can cover, so coverage can be combined as int bitsets."""
+
+
+class FeatureTable:
+    """Every feature, like "Host create", seen in this process, numbered as first seen.
+
+    A set of features is an int with the bit of each feature's number set, so
+    merging coverage is a single |. Each feature is kept as one shared string,
+    with the entity it starts with. Numbers are only meaningful within a process,
+    so anything stored or sent elsewhere is converted back to feature names.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget every feature, once no bitset made from the current numbers is kept."""
+        self._ids = {}  # {feature: number}
+        self._features = []  # [feature], by number
+        self._entities = []  # [the entity starting each feature], by number
+
+    def id(self, feature):
+        if (number := self._ids.get(feature)) is None:
+            number = self._ids[feature] = len(self._features)
+            self._features.append(feature)
+            self._entities.append((feature.split() or [""])[0])
+        return number
+
+    def intern(self, feature):
+        """Return the one string kept for a feature, so equal features share memory."""
+        return self._features[self.id(feature)]
+
+    def entity(self, feature):
+        return self._entities[self.id(feature)]
+
+    def mask(self, features):
+        """Return the bitset of some features."""
+        mask = 0
+        for feature in features:
+            mask |= 1 << self.id(feature)
+        return mask
+
+    def features(self, mask):
+        """Return the features in a bitset."""
+        features = set()
+        while mask:
+            lowest = mask & -mask
+            features.add(self._features[lowest.bit_length() - 1])
+            mask ^= lowest
+        return features
+
+
+# Force singleton behavior
+FeatureTable = FeatureTable()
@@ -1,18 +1,28 @@
 """A collection of miscellaneous helpers that don't quite fit in."""
+from functools import cache
+import os
 from pathlib import Path
+import subprocess
 
 import click
 from logzero import logger
 import yaml
 
-from plinko.config import BANNED_DIRS, PLINKO_DATA_DIR
+from plinko import walker
+from plinko.call_graph import CallGraph
+from plinko.config import PLINKO_DATA_DIR
+from plinko.set_cover import SetCover
+
+# the libyaml backed loader and dumper are many times faster, when PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CFullLoader", yaml.FullLoader)
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
 
 
 def import_yaml(fpath):
     imported = {}
     with Path(fpath).open() as opened:
         try:
-            imported = yaml.load(opened, Loader=yaml.FullLoader)
+            imported = yaml.load(opened, Loader=YAML_LOADER)
         except Exception as e:
             logger.warning(f"Unable to load {fpath} due to {e}")
     return imported
@@ -75,72 +85,25 @@ def gen_variants(text):
     return [low_str, up_str, f"{low_str}s", f"{up_str}S"]
 
 
-def get_coverage(method, method_dict, coverage=None, chain=None):
-    """Recursively chase down coverage for a method, returning a list of what is covered."""
-    # recursion safety
-    if not chain:
-        chain = set()
-    elif method in chain:
-        return method_dict[method].covers
-    else:
-        chain.update(method)
-    # now recursivley determine the coverage
-    if getattr(method_dict.get(method), "covers", None) is None:
-        # This is an unresolved method
-        return
-    if coverage:
-        coverage.update(method_dict[method].covers)
-    else:
-        coverage = method_dict[method].covers.copy()  # copy it to avoid mutating the original
-    for call in method_dict[method].calls:
-        call_covers = get_coverage(call, method_dict, coverage, chain)
-        if call_covers:
-            coverage.update(call_covers)
-    return coverage
-
-
-def _identify_not_needed(min_coverage, all_coverage):
-    """Identify tests that are not needed."""
-    def count_in_list(needle, haystack):
-        """Count the number of times a needle appears in a list."""
-        return sum(1 for x in haystack if x == needle)
-
-    for name, coverage in min_coverage.items():
-        if all(count_in_list(cov, all_coverage) > 1 for cov in coverage):
-            return name
+def get_coverage(method, method_dict):
+    """Return everything a method covers, following its calls through the method dict."""
+    return CallGraph(method_dict).coverage(method)
 
 
 def get_min_tests(test_dict, test_startswith="test_", compile_cov=False):
     """Takes in a dict, mapping method names to what they cover.
     returns a dict of tests that cover everything with as little overlap as possible.
+    See set_cover.SetCover for how the tests are chosen.
     """
     if compile_cov:
         compiled_coverage = {}
+        call_graph = CallGraph(test_dict)
         for method in test_dict:
             if test_startswith in method:
-                compiled_coverage[method] = get_coverage(method, test_dict)
+                compiled_coverage[method] = call_graph.coverage(method)
     else:
         compiled_coverage = test_dict.copy()
-    min_coverage = {}
-    all_coverage = []  # a running list of featues covered
-    # now we want to sort our test from most to least coverage
-    sorted_tests = sorted(
-        compiled_coverage, key=lambda covs: len(compiled_coverage[covs]), reverse=True
-    )
-    for test in sorted_tests:
-        to_add = False
-        for covered in compiled_coverage[test]:
-            if covered not in all_coverage and not to_add:
-                # this test add coverage, so we'll add it in
-                to_add = True
-                break
-        min_coverage[test] = compiled_coverage[test]
-        all_coverage.extend(compiled_coverage[test])
-    # now we make sure tests that are not needed are removed
-    while (to_remove := _identify_not_needed(min_coverage, all_coverage)):
-        del min_coverage[to_remove]
-        all_coverage = [c for covs in min_coverage.values() for c in covs]
-    return min_coverage
+    return SetCover(compiled_coverage).minimal()
 
 
 def get_pt_project_name(pt_export):
@@ -151,6 +114,50 @@ def get_pt_project_name(pt_export):
                 return line.split(",")[0].split("/")[-1]
 
 
+def _run_git(path, *args):
+    """Run a git command in the directory holding a path, returning its output or None."""
+    path = Path(path).absolute()
+    try:
+        return subprocess.run(
+            ["git", *args],
+            cwd=path if path.is_dir() else path.parent,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_git_commit(path, ref="HEAD"):
+    """Return the commit a ref points to in the git repository holding a path, if any."""
+    if (output := _run_git(path, "rev-parse", "--verify", f"{ref}^{{commit}}")) is not None:
+        return output.strip()
+
+
+def get_changed_files(path, base_ref):
+    """Return the absolute paths of every file changed since a git ref, or None.
+
+    This includes uncommitted changes, deleted files and untracked files that
+    aren't ignored.
+    """
+    # build on the path as given, so the results compare equal to other absolute paths
+    path = Path(path).absolute()
+    cdup = _run_git(path, "rev-parse", "--show-cdup")
+    changed = _run_git(path, "diff", "--name-only", base_ref, "--")
+    # from the top of the repository, like diff, not just below the path
+    untracked = _run_git(
+        path, "ls-files", "--others", "--exclude-standard", "--full-name", "--", ":/"
+    )
+    if None in (cdup, changed, untracked):
+        return None
+    root = (path if path.is_dir() else path.parent) / cdup.strip()
+    return {
+        Path(os.path.normpath(root / name))
+        for name in changed.splitlines() + untracked.splitlines()
+    }
+
+
 def get_version(diff_file, ix=True):
     """Determine the product version from the diff file name.
     param ix denotes if the diff file was generated by APIx or CLIx.
@@ -174,25 +181,47 @@ def write_to_file(data, path, name="results"):
     path.touch()
     logger.info(f"Saving {name} to {path.absolute()}")
     with path.open("w+") as outfile:
-        yaml.dump(data, outfile, default_flow_style=False)
+        yaml.dump(data, outfile, Dumper=YAML_DUMPER, default_flow_style=False)
+
+
+def iter_flattened(data, parents=""):
+    """Lazily yield each value in nested lists and dicts, after the keys leading to it.
+
+    For example, {"hosts": ["create", {"subscription": ["attach"]}]} yields
+    "hosts create" and then "hosts subscription attach". The nesting is walked
+    with a stack of iterators rather than recursion, so depth doesn't matter
+    and only the path to the current value is held.
+    """
+    # [(the keys so far, an iterator over a dict's items or a list's values)]
+    stack = [(parents, iter([data]), False)]
+    while stack:
+        parents, items, in_dict = stack[-1]
+        for item in items:
+            if in_dict:
+                key, item = item
+                prefix = f"{parents} {key}"
+            else:
+                prefix = parents
+            if isinstance(item, dict):
+                stack.append((prefix, iter(item.items()), True))
+                break
+            if isinstance(item, list):
+                stack.append((prefix, iter(item), False))
+                break
+            yield f"{prefix} {item}".strip()
+        else:
+            stack.pop()
 
 
 def flatten_mixed(data, outlist=None, parents=""):
     """Flatten a data structure of nested lists and dicts into a single list."""
     if outlist is None:
         outlist = []
-    if isinstance(data, dict):
-        [
-            flatten_mixed(children, outlist, f"{parents} {key}")
-            for key, children in data.items()
-        ]
-    elif isinstance(data, list):
-        [flatten_mixed(child, outlist, parents) for child in data]
-    else:
-        outlist.append(f"{parents} {data}".strip())
+    outlist.extend(iter_flattened(data, parents))
     return outlist
 
 
+@cache
 def normalize_text(in_str, style):
     """Format a string to match the style pattern expected."""
     decomposed_str = in_str.lower().replace("-", " ").replace("_", " ").split()
@@ -217,7 +246,10 @@ def get_diff_dict(diff_path, flatten=True, ignore=None):
             "Incorrect diff format. Rerun CLIx's diff/explore with the --compact option"
         )
         return
-    diff_dict = import_yaml(diff_path)
+    # deferred, since the cache module builds on these helpers
+    from plinko.cache import DiffCache
+
+    diff_dict = DiffCache().load(diff_path, import_yaml)
     if "-comp.yaml" in diff_path:
         diff_dict = {"buffer": diff_dict}
     return (
@@ -227,6 +259,20 @@ def get_diff_dict(diff_path, flatten=True, ignore=None):
     )
 
 
+def merge_diff_dicts(diff_dicts):
+    """Combine diff dicts into one holding every entity, and method, from each."""
+    merged = {}
+    for diff_dict in diff_dicts:
+        for entity, methods in diff_dict.items():
+            if isinstance(methods, list) and isinstance(merged.get(entity), list):
+                merged[entity] = merged[entity] + [
+                    meth for meth in methods if meth not in merged[entity]
+                ]
+            else:
+                merged.setdefault(entity, methods)
+    return merged
+
+
 def plinko_to_ptcommand(plinko_results, allow_dupes=False):
     """Convert plinko-identified tests into pytest arguments."""
     pytest_list = []
@@ -234,32 +280,27 @@ def plinko_to_ptcommand(plinko_results, allow_dupes=False):
         plinko_results, label="Converting results to pytest command"
     ) as plink_res:
         for feature in plink_res:
-            file_name = next(iter(feature[1].keys()))
-            if isinstance(feature[1][file_name], dict):  # unittest style
-                for test_class in feature[1][file_name]:
-                    for test in feature[1][file_name][test_class]:
-                        pytest_list.append(f"{file_name}::{test_class}::{test}")
-            else:
-                for test in feature[1][file_name]:
-                    pytest_list.append(f"{file_name}::{test}")
+            for file_name, tests in feature[1].items():
+                if isinstance(tests, dict):  # unittest style, module level tests under None
+                    for test_class, class_tests in tests.items():
+                        for test in class_tests:
+                            pytest_list.append(
+                                "::".join(filter(None, (file_name, test_class, test)))
+                            )
+                else:
+                    for test in tests:
+                        pytest_list.append(f"{file_name}::{test}")
         if not allow_dupes:
             pytest_list = set(pytest_list)
             logger.info(f"Found {len(pytest_list)} unique tests.")
     return f"pytest -v {' '.join(pytest_list)}"
 
 
-def recurse_down(dir_path, suffix=None, ignore=None):
-    """Given a base directory, return a list of all nested files."""
-    results = []
-    for item in dir_path.iterdir():
-        if item.is_dir() and item.name not in BANNED_DIRS:
-            results.extend(recurse_down(item, suffix, ignore))
-        elif item.is_file():
-            if ignore and ignore in item.name:
-                continue
-            if (not suffix) or (suffix and item.suffix == suffix):
-                results.append(item)
-    return results
+def recurse_down(dir_path, suffix=None, ignore=None, include=(), exclude=None, gitignore=None):
+    """Given a base directory, lazily yield all nested files."""
+    return walker.walk_files(
+        dir_path, suffix, ignore, include=include, exclude=exclude, gitignore=gitignore
+    )
 
 
 def recurse_up(dir_path, root_path, suffix=None, ignore=None):
@@ -268,15 +309,15 @@ def recurse_up(dir_path, root_path, suffix=None, ignore=None):
         dir_path = dir_path.parent
     dir_path = dir_path.resolve()
     results = []
-    for item in dir_path.iterdir():
-        if item.is_file():
-            if ignore and ignore in item.name:
+    while True:
+        for name in walker.list_dir(dir_path):
+            if ignore and ignore in name:
                 continue
-            if (not suffix) or (suffix and item.suffix == suffix):
-                results.append(item)
-    if dir_path.parent >= root_path:
-        results.extend(recurse_up(dir_path.parent, root_path, suffix, ignore))
-    return results
+            if (not suffix) or (suffix and Path(name).suffix == suffix):
+                results.append(dir_path / name)
+        if dir_path.parent == dir_path or not dir_path.parent >= root_path:
+            return results
+        dir_path = dir_path.parent
 
 
 def expand_dict_keys(to_insert, sep=":"):
@@ -0,0 +1,105 @@
+"""Limit analysis to what can cover the features of the diffs being checked."""
+import ast
+import sys
+
+from plinko import helpers
+from plinko.features import FeatureTable
+from plinko.parsers.python_importer import ImportManager
+from plinko.parsers.source_cache import SourceCache
+
+
+def _method_key(path):
+    """Normalize the words of a method path, so diff and code spellings compare equal."""
+    return " ".join(helpers.normalize_text(word, "example_name") for word in path.split())
+
+
+class DiffScope:
+    """The features of a diff, and which modules can reach code that covers them.
+
+    A function only gains coverage from lines mentioning a known entity, or from
+    what it calls. So a module can only add coverage if its source mentions an
+    entity, or one of its imports can, within the depth left to follow imports.
+    Modules are checked from their raw text and import statements, without
+    analyzing any of their functions, and each is checked once per depth.
+    """
+
+    def __init__(self, entity_methods, entity_matcher, class_name_style):
+        self.entity_matcher = entity_matcher
+        # {entity: {every method path in the diff, and each path leading to one}}
+        self._methods = {}
+        for entity, methods in entity_methods.items():
+            paths = self._methods.setdefault(
+                helpers.normalize_text(entity, class_name_style), set()
+            )
+            for path in helpers.iter_flattened(methods):
+                words = _method_key(path).split()
+                paths.update(" ".join(words[:end]) for end in range(1, len(words) + 1))
+        self._held = {}  # {feature: whether the diff holds it}
+        self._mentions = {}  # {module path: whether its source mentions an entity}
+        self._reach = {}  # {(module path, depth left): (can reach, [files checked])}
+
+    def holds(self, feature):
+        """Check whether a feature, like "Host create", is one of the diff's."""
+        if (held := self._held.get(feature)) is None:
+            entity = FeatureTable.entity(feature)
+            method = _method_key(feature[len(entity) :])
+            held = self._held[feature] = method in self._methods.get(entity, ())
+        return held
+
+    def _mentions_entity(self, file_path):
+        if (mentions := self._mentions.get(file_path)) is None:
+            try:
+                text = SourceCache.read_text(file_path)
+            except (OSError, UnicodeDecodeError):
+                text = ""
+            mentions = self._mentions[file_path] = bool(self.entity_matcher.find(text))
+        return mentions
+
+    @staticmethod
+    def _imported_files(file_path):
+        """Yield the files a module's imports point to, located as the parser would."""
+        try:
+            tree = SourceCache.parse(file_path)
+        except (OSError, SyntaxError, UnicodeDecodeError):
+            return
+        for node in tree.body:
+            if isinstance(node, ast.ImportFrom):
+                imports = [
+                    (name.asname or name.name, node.module, name.name if name.asname else None)
+                    for name in node.names
+                ]
+            elif isinstance(node, ast.Import):
+                imports = [
+                    (name.asname, name.name, None) if name.asname else (name.name, None, None)
+                    for name in node.names
+                ]
+            else:
+                continue
+            for import_name, module_name, real_name in imports:
+                top_level = (module_name or import_name).split(".")[0]
+                if top_level in sys.stdlib_module_names:
+                    continue  # nothing in the stdlib provides coverage
+                if found := ImportManager.locate(import_name, module_name, real_name):
+                    yield found
+
+    def reach(self, file_path, depth):
+        """Check whether a module, following imports depth more times, can add coverage.
+
+        Returns whether it can, and every file checked to decide, which results
+        that skip the module still depend on.
+        """
+        key = (file_path, depth)
+        if key in self._reach:
+            return self._reach[key]
+        # each import is followed with less depth left, so import cycles end
+        files, reaches = [file_path], self._mentions_entity(file_path)
+        if not reaches and depth > 0:
+            for imported in self._imported_files(file_path):
+                if imported == file_path:
+                    continue
+                reaches, checked = self.reach(imported, depth - 1)
+                files.extend(checked)
+                if reaches:
+                    break
+        self._reach[key] = (reaches, list(dict.fromkeys(files)))
+        return self._reach[key]
@@ -1,24 +1,131 @@
 import ast
-import inspect
 from pathlib import Path
 
 from logzero import logger
 
-from plinko.helpers import recurse_up
+from plinko.features import FeatureTable
+from plinko.helpers import recurse_down, recurse_up
+from plinko.parsers.source_cache import SourceCache
 
 # parametrized fixtures
 # mark.usefixtures
 # function arguments
 
-# TODO: Recursively resolve fixture coverage - pull from parent fixtures
+PLUGINS = ""  # the scope of fixtures from pytest_plugins modules, visible everywhere
+
+
+class FixtureGraph:
+    """Every known fixture, by the scope it is visible in, with memoized coverage.
+
+    Scopes follow pytest: a test module's own fixtures, then those of the conftest
+    files in its directory and each one above, then plugins. Nearer definitions
+    shadow those further away. A fixture's coverage is its own plus that of every
+    fixture it requests, looked up from where it is defined, and is resolved once.
+    """
+
+    def __init__(self, scopes=None):
+        self.scopes = scopes or {}  # {test module, conftest directory or PLUGINS: {name: fixture}}
+        self._coverage = {}  # {(scope, fixture name): coverage bitset}
+        self._visible = {}  # {path: [scopes visible from it, nearest first]}
+        self._real_paths = {}  # {path as given: resolved path}
+
+    def _real_path(self, path):
+        if path not in self._real_paths:
+            self._real_paths[path] = str(Path(path).resolve())
+        return self._real_paths[path]
+
+    def add(self, scope, fixture):
+        """Add a fixture to a conftest or plugin scope, unless it has one by that name."""
+        if scope != PLUGINS:
+            scope = self._real_path(scope)
+        self.scopes.setdefault(scope, {}).setdefault(fixture.name, fixture)
+        self._coverage.clear()
+        self._visible.clear()
+
+    def set_module_fixtures(self, module_path, fixtures):
+        """Set the fixtures a test module defines for itself."""
+        module_path = self._real_path(module_path)
+        self.scopes[module_path] = {}
+        for fixture in fixtures:
+            self.scopes[module_path].setdefault(fixture.name, fixture)
+        # only the module itself sees its scope
+        self._visible.pop(module_path, None)
+        for key in [key for key in self._coverage if key[0] == module_path]:
+            del self._coverage[key]
+
+    def forget_module(self, module_path):
+        """Drop a test module's own fixtures, once nothing else will be parsed against them."""
+        module_path = self._real_path(module_path)
+        if self.scopes.pop(module_path, None) is not None:
+            self._visible.pop(module_path, None)
+            for key in [key for key in self._coverage if key[0] == module_path]:
+                del self._coverage[key]
+
+    def visible_scopes(self, path):
+        """Return the scopes visible from a file or scope, nearest first."""
+        if path == PLUGINS:
+            return [PLUGINS] if PLUGINS in self.scopes else []
+        path = self._real_path(path)
+        if path not in self._visible:
+            self._visible[path] = [
+                str(parent)
+                for parent in (Path(path), *Path(path).parents)
+                if str(parent) in self.scopes
+            ]
+            if PLUGINS in self.scopes:
+                self._visible[path].append(PLUGINS)
+        return self._visible[path]
+
+    def find(self, name, path, after=None):
+        """Return the scope and fixture a name refers to from a file or scope, if any.
+
+        Fixtures overriding one of the same name request it from a later scope.
+        """
+        scopes = self.visible_scopes(path)
+        if after is not None:
+            scopes = scopes[scopes.index(after) + 1 :] if after in scopes else []
+        for scope in scopes:
+            if fixture := self.scopes[scope].get(name):
+                return scope, fixture
+
+    def coverage(self, scope, name):
+        """Return everything a fixture covers, including through the fixtures it requests."""
+        return FeatureTable.features(self._coverage_mask(scope, name))
+
+    def _coverage_mask(self, scope, name):
+        key = (scope, name)
+        if key not in self._coverage:
+            fixture = self.scopes[scope][name]
+            # stored before following requests, so a cycle can't recurse forever
+            coverage = self._coverage[key] = FeatureTable.mask(fixture.covers)
+            for arg in fixture.args:
+                if found := self.find(arg, scope, after=scope if arg == name else None):
+                    coverage |= self._coverage_mask(found[0], found[1].name)
+            self._coverage[key] = coverage
+        return self._coverage[key]
+
 
 class FixtureHandler:
     # TODO: Resolve parametrized fixture use
     def __init__(self, base_path=None):
         self.base_path = Path(base_path or ".")
-        self._pending_files = {}  # {file_path: PyParser}
         self._main_parser = None  # deferred to avoid circular imports
-        self.fixtures = {}  # {Function.name: fixture Function}
+        self.reset()
+
+    def reset(self):
+        """Forget every fixture found so far."""
+        self._pending_files = {}  # {file_path: (scope, PyParser)}
+        self.graph = FixtureGraph()
+        self.source_files = {}  # {conftest or plugin file: scope of its fixtures}
+
+    def files_for(self, file_path):
+        """Return the conftest and plugin files whose fixtures a file can see."""
+        parents = {str(parent) for parent in Path(file_path).resolve().parents}
+        return [
+            path
+            for path, scope in self.source_files.items()
+            if scope == PLUGINS or scope in parents
+        ]
 
     @property
     def pyparser(self):
@@ -31,60 +138,47 @@ class FixtureHandler:
         haystack = haystack or self.base_path
         logger.debug(f"Checking for fixture files in {haystack}")
         if isinstance(haystack, Path) and haystack.exists():
-            for file in recurse_up(
-                haystack, self._main_parser.project_root, ".py", "test_"
-            ):
+            files = recurse_up(haystack, self._main_parser.project_root, ".py", "test_")
+            if haystack.is_dir():
+                # conftests below only apply to the tests beneath them, as scoped
+                files.extend(path.resolve() for path in recurse_down(haystack, ".py", "test_"))
+            for file in dict.fromkeys(files):
                 if file.name == "conftest.py":
                     logger.debug(f"Found conftest.py in {file.absolute()}")
                     self._parse_conftest(file)
-        if inspect.ismodule(haystack):
-            """check for pytest_plugins = []"""
-            for name, obj in haystack.__dict__.items():
-                if self._is_fixture(obj):
-                    breakpoint()
-                    # how'd you get here, jake?
-                    self.fixtures[f"{haystack.__name__}:{name}"] = obj
 
     def parse_pending(self):
         """Parse all pending fixture files."""
-        for parser in self._pending_files.values():
+        for scope, parser in self._pending_files.values():
             parser.parse()
             for obj in list(parser.methods.values()):  # saw weird behavior with mapping alone
-                if obj.is_fixture and obj.name not in self.fixtures:
-                    self.fixtures[obj.name] = obj
+                if obj.is_fixture:
+                    obj.release()
+                    self.graph.add(scope, obj)
         self._pending_files = {}
 
     def _file_has_fixtures(self, file_path):
-        with file_path.open() as file_stream:
-            for line in file_stream:
-                if "from pytest import fixture" in line:
-                    return True
-                if "pytest.fixture" in line:
-                    return True
-
-    def _is_fixture(obj):
-        """Determine if a function is a fixture."""
-        if inspect.isfunction(obj):
-            return getattr(obj, "_pytestfixturefunction", False)
-        else:
-            logger.error(f"{obj} is a {type(obj)}, not a function")
+        source = SourceCache.read_text(file_path)
+        return "from pytest import fixture" in source or "pytest.fixture" in source
 
     def _parse_conftest(self, file_path):
         """Parse a conftest.py file to find interests."""
+        scope = str(file_path.parent.resolve())
+        self.source_files[file_path] = scope
         if self._file_lists_plugins(file_path):
             self._pull_plugins(file_path)
         if self._file_has_fixtures(file_path):
-            self._pending_files[file_path] = self.pyparser(file_path, self._main_parser)
+            self._pending_files[file_path] = (
+                scope,
+                self.pyparser(file_path, self._main_parser),
+            )
 
     def _file_lists_plugins(self, file_path):
-        with file_path.open() as file_stream:
-            for line in file_stream:
-                if "pytest_plugins = [" in line:
-                    return True
+        return "pytest_plugins = [" in SourceCache.read_text(file_path)
 
     def _pull_plugins(self, file_path):
         """Parse through a conftest ast and pull a list of plugin files."""
-        for node in ast.walk(ast.parse(file_path.read_text())):
+        for node in ast.walk(SourceCache.parse(file_path)):
             if isinstance(node, ast.Assign):
                 if isinstance(node.value, ast.List):
                     for item in node.value.elts:
@@ -92,9 +186,11 @@ class FixtureHandler:
                             f_path = Path(f"{item.s.replace('.','/')}.py")
                             f_path = self._main_parser.project_root / f_path
                             # import IPython; IPython.embed()
+                            self.source_files[f_path] = PLUGINS
                             if self._file_has_fixtures(f_path):
-                                self._pending_files[f_path] = self.pyparser(
-                                    f_path, self._main_parser
+                                self._pending_files[f_path] = (
+                                    PLUGINS,
+                                    self.pyparser(f_path, self._main_parser),
                                 )
 
 
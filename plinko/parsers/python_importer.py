@@ -1,42 +1,104 @@
-import ast
+import bisect
 import builtins
 import collections
 import sys
 
 from logzero import logger
 
+from plinko.parsers.source_cache import SourceCache
 from plinko.parsers.source_finder import find_file_from_import
 
 BUILTINS = dir(builtins)
 
 
 class ImportManager:
-    known_imports = {}  # {name: {import location:, methods:, ast:}
+    known_imports = {}  # {name: {import location:, methods:}}
+    _locations = {}  # {(name, module_name, real_name, call_path): source file}
+    module_summaries = {}  # {(module path, remaining depth): ModuleSummary}
+    # reverse lookups, each {value: [import names in registration order]}
+    _by_module_name, _by_real_name, _by_target = {}, {}, {}
+    _positions = {}  # {import name: registration order}
+    _unresolved = {}  # {import name: None}, entries without a location yet, oldest first
 
     def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget every import, and everything learned from the files they point to."""
+        self.known_imports.clear()
+        for lookup in (self._by_module_name, self._by_real_name, self._by_target):
+            lookup.clear()
+        self._positions.clear()
+        self._unresolved.clear()
+        self._locations.clear()
+        self.module_summaries.clear()
         # nothing in the stdlib provides coverage
         for name in sys.stdlib_module_names:
-            self.known_imports[name] = {
-                "location": "stdlib",
-                "coverage": None,
-                "methods": None,
-            }
+            self._set_entry(
+                name, {"location": "stdlib", "coverage": None, "methods": None}
+            )
+
+    @staticmethod
+    def _target(info):
+        """Return the fully qualified name an import refers to, if known."""
+        if module_name := info.get("module_name"):
+            if real_name := info.get("real_name"):
+                return f"{module_name}.{real_name}"
+            return module_name
+
+    def _lookups(self, info):
+        return (
+            (self._by_module_name, info.get("module_name")),
+            (self._by_real_name, info.get("real_name")),
+            (self._by_target, self._target(info)),
+        )
+
+    def _set_entry(self, import_name, info):
+        """Add or replace an import entry, keeping the reverse lookups in step."""
+        if old_info := self.known_imports.get(import_name):
+            for lookup, value in self._lookups(old_info):
+                if value:
+                    lookup[value].remove(import_name)
+        else:
+            self._positions[import_name] = len(self._positions)
+        self.known_imports[import_name] = info
+        if info.get("location"):
+            self._unresolved.pop(import_name, None)
+        else:
+            self._unresolved[import_name] = None
+        # a replaced entry keeps its place, so each list stays in registration order
+        for lookup, value in self._lookups(info):
+            if value:
+                bisect.insort(
+                    lookup.setdefault(value, []),
+                    import_name,
+                    key=self._positions.__getitem__,
+                )
+
+    def _first_registered(self, *candidates):
+        """Return the earliest registered import name out of lists of candidates."""
+        candidates = [names[0] for names in candidates if names]
+        if candidates:
+            return min(candidates, key=self._positions.__getitem__)
 
     def _find_import(self, import_name):
         """Given an import name, try to find it and return the known key."""
         if import_name in self.known_imports:
             return import_name
-        for key, val in self.known_imports.items():
-            if import_name in (val.get("module_name"), val.get("real_name")):
-                return key
+        return self._first_registered(
+            self._by_module_name.get(import_name), self._by_real_name.get(import_name)
+        )
+
+    def find_target(self, target):
+        """Return the first import name registered for a fully qualified name."""
+        return self._first_registered(self._by_target.get(target))
 
     def register(self, import_name, module_name=None, real_name=None):
         """Add a new import if it isn't already known."""
         if import_name not in self.known_imports:
-            self.known_imports[import_name] = {
-                "module_name": module_name,
-                "real_name": real_name,
-            }
+            self._set_entry(
+                import_name, {"module_name": module_name, "real_name": real_name}
+            )
 
     def get_file(self, import_name):
         if not self._find_import(import_name):
@@ -48,9 +110,12 @@ class ImportManager:
             return file
 
     def get_ast(self, import_name):
-        if not self._find_import(import_name):
-            self.import_module(import_name)
-        return self.known_imports.get(import_name, {}).get("ast")
+        """Return the syntax tree of an import's file, parsed only when asked for."""
+        if file := self.get_file(import_name):
+            try:
+                return SourceCache.parse(file)
+            except (OSError, SyntaxError, UnicodeDecodeError):
+                return None
 
     def add_methods(self, import_name, methods):
         if not self._find_import(import_name):
@@ -68,68 +133,104 @@ class ImportManager:
 
     def resolve_import(self, import_name, call_path=None):
         """Attempt to resolve an import, returning the most beneficial information."""
-        # First, return if we already know the import contents
+        # First, return if we already know where the import points
         if self.known_imports[import_name].get("coverage") or self.known_imports[
             import_name
-        ].get("ast"):
+        ].get("location") not in (None, "stdlib", "~bad~"):
             return
         if self.known_imports[import_name].get("location") == "~bad~":
             return  # known bad import
         # make sure this isn't an uncaught builtin object
         if import_name in BUILTINS:
             logger.debug(f"{import_name} is a python builtin; ignoring.")
-            self.known_imports[import_name] = {
-                "location": "~bad~",
-                "coverage": None,
-                "methods": None,
-            }
+            self._set_entry(
+                import_name, {"location": "~bad~", "coverage": None, "methods": None}
+            )
             return
         # Next, attempt to perform the import
         self.known_imports[import_name]["location"] = self.known_imports[
             import_name
         ].get("location")
+        # only the location is kept, files are parsed when something asks for them
+        source_file = self.locate(
+            import_name,
+            self.known_imports[import_name].get("module_name"),
+            self.known_imports[import_name].get("real_name"),
+            call_path,
+        )
+        self.known_imports[import_name]["location"] = source_file or "~bad~"
+
+    def locate(self, import_name, module_name=None, real_name=None, call_path=None):
+        """Find the source file an import refers to, returning None if there isn't one."""
+        key = (import_name, module_name, real_name, call_path)
+        if key in self._locations:
+            return self._locations[key]
         logger.debug(f"Trying to import module {import_name}")
-        real_name = (
-            self.known_imports[import_name].get("real_name") or import_name
-        )  # import x as y
-        true_import = self.known_imports[import_name].get("module_name") or real_name
-        # logger.debug(f"true import 1 {true_import}")
+        real_name = real_name or import_name  # import x as y
+        true_import = module_name or real_name
         if real_name not in true_import:
             if call_path:
                 # a more complex call path was given importedmodule.sub.method
                 call_path = call_path.replace(import_name, real_name)
                 real_name = call_path.replace(" ", ".")
             true_import += "." + real_name
-        # logger.debug(f"true import 2 {true_import}")
         try:
             source_file = find_file_from_import(true_import.replace(" ", "."))
         except ModuleNotFoundError:
             source_file = None
         logger.debug(source_file or true_import)
         if source_file is None:
-            self.known_imports[import_name]["location"] = "~bad~"
             logger.warning(
                 f"Unable to import {true_import}. Make sure it is installed.\n"
                 f"{true_import=}, {call_path=}"
             )
-            return
-        self.known_imports[import_name]["location"] = source_file
-        self.known_imports[import_name]["ast"] = ast.parse(source_file.read_text())
+        self._locations[key] = source_file
+        return source_file
 
     def import_module(self, module_name):
         """Import the code from a specific module."""
         self.register(module_name)
         if module_name in self.known_imports:
             return self.resolve_import(module_name)
-        for key, val in self.known_imports.items():
-            if val.get("real_name") == module_name:
-                return self.resolve_import(key)
+        if key := self._first_registered(self._by_real_name.get(module_name)):
+            return self.resolve_import(key)
 
     def resolve_all(self):
-        for key in list(self.known_imports.keys()):
+        """Resolve every import added since the last call, each only once."""
+        while self._unresolved:
+            key = next(iter(self._unresolved))
+            del self._unresolved[key]
             if not self.known_imports[key].get("location"):
                 self.resolve_import(key)
 
+    def registrations(self):
+        """Return how every non-stdlib import was registered, in registration order."""
+        return {
+            name: (info.get("module_name"), info.get("real_name"))
+            for name, info in self.known_imports.items()
+            if info.get("location") != "stdlib"
+        }
+
+    def snapshot(self):
+        """Return a copy of the known imports that can later be restored."""
+        return {
+            name: {
+                key: val.copy() if isinstance(val, set) else val
+                for key, val in info.items()
+            }
+            for name, info in self.known_imports.items()
+        }
+
+    def restore(self, snapshot):
+        """Reset the known imports to a previously taken snapshot."""
+        self.known_imports.clear()
+        for lookup in (self._by_module_name, self._by_real_name, self._by_target):
+            lookup.clear()
+        self._positions.clear()
+        self._unresolved.clear()
+        for import_name, info in snapshot.items():
+            self._set_entry(import_name, info)
+
 
 # Force singleton behavior
 ImportManager = ImportManager()
@@ -1,121 +1,151 @@
 """This module uses multiple techniques to gain insight about known entity usage."""
 import ast
+import copy
+import logging
 from pathlib import Path
 
 from logzero import logger
 
 from plinko import code_parser
-from plinko.helpers import gen_variants, get_coverage
+from plinko.call_graph import CallGraph
+from plinko.features import FeatureTable
 from plinko.parsers import python_importer
+from plinko.parsers.source_cache import SourceCache
 
 
-class NodeParser(ast.NodeVisitor):
-    """Move through a series of nodes and pull out relevant information."""
+def dotted_name(node):
+    """Return the source text of a name or attribute chain, unparsing anything else."""
+    parts, current = [], node
+    while isinstance(current, ast.Attribute):
+        parts.append(current.attr)
+        current = current.value
+    if isinstance(current, ast.Name):
+        return ".".join([current.id, *reversed(parts)])
+    return ast.unparse(node).strip()
 
-    def __init__(self, **kwargs):
-        self.interests = {
+
+class LazySource:
+    """Unparse a node only once, and only when its text is actually needed."""
+
+    def __init__(self, node):
+        self.node = node
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = ast.unparse(self.node)
+        return self._text
+
+    def __contains__(self, item):
+        return item in str(self)
+
+
+class BodyAnalyzer:
+    """Walk a statement once and pull out relevant information.
+
+    Each node is visited with the context it was reached in: the role it plays
+    for its parent (target/value of an assignment, function being called,
+    value of an attribute) and whether it sits within an assignment's target
+    or value. Arguments to a call start from a fresh context.
+    """
+
+    # this should be assigned to the Setting(s) entity instead of search
+    # [D 230822 12:53:00 python_parser:179] Investigating line: setting_object = entities.Setting().search(query={'search': f'name={request.param}'})[0]
+    # [D 230822 12:53:00 python_parser:184] Found interests {'method_calls': ['search'], 'attributes_accessed': ['entities.Setting', 'param'], 'module_accessed': ['entities', 'request'], 'entity_instance': ['Setting'], 'assignment': {'setting_object': 'search'}}
+
+    def analyze(self, statement, known_entities=()):
+        """Return the interests found in a single statement."""
+        interests = {
             "method_calls": [],  # [{module: method}]
             "attributes_accessed": [],  # [attribute name]
             "module_accessed": [],  # [module name]
             "entity_instance": [],  # [entity name]
+            "instanced": [],  # [name of anything called, then used, like Thing().create()]
             "assignment": {},  # {target: value}
         }
-        self.known_entities = kwargs.get("known_entities", [])
-        super()
-
-    def _add_to_path(self, parent, child, type_name=None):
-        """Add a specific or empty _path list to each visited node."""
-        if not parent.__dict__.get("_path"):
-            parent._path = []
-        if not child.__dict__.get("_path"):
-            child._path = parent._path[:]
-        if type_name:
-            child._path.append(type_name)
-
-    def _handle_assignment(self, node, name):
-        """Read a node's path and determine if it is part of an assignment."""
-        if "assignment" in node._path:
-            if node._path[-1] == "target":
-                self.interests["assignment"][ast.unparse(node).strip()] = None
-            elif "value" in node._path:
-                for key, val in self.interests["assignment"].items():
-                    if val is None:
-                        self.interests["assignment"][key] = name
-
-    # this should be assigned to the Setting(s) entity instead of search
-    # [D 230822 12:53:00 python_parser:179] Investigating line: setting_object = entities.Setting().search(query={'search': f'name={request.param}'})[0]
-    # [D 230822 12:53:00 python_parser:184] Found interests {'method_calls': ['search'], 'attributes_accessed': ['entities.Setting', 'param'], 'module_accessed': ['entities', 'request'], 'entity_instance': ['Setting'], 'assignment': {'setting_object': 'search'}}
-
-
-    def generic_visit(self, node):
-        """Add a _path attribute to each node to track parents."""
-        for child in ast.iter_child_nodes(node):
-            self._add_to_path(node, child, "generic")
-        ast.NodeVisitor.generic_visit(self, node)
-
-    def visit_Assign(self, node):
-        for child in ast.iter_child_nodes(node):
-            self._add_to_path(node, child, "assignment")
-            if child in node.targets:
-                self._add_to_path(node, child, "target")
-            else:
-                self._add_to_path(node, child, "value")
-        ast.NodeVisitor.generic_visit(self, node)
-
-    def visit_Call(self, node):
-        for child in ast.iter_child_nodes(node):
-            if node.func == child:
-                self._add_to_path(node, child, "call")
-        ast.NodeVisitor.generic_visit(self, node)
-
-    def visit_Attribute(self, node):
-        """Visit an Attribute node and add relevant information to the interests dictionary.
-        If the attribute is being called, check if it is a known entity instance or a method call.
-        If it is a known entity instance, add the attribute to the attributes_accessed list.
-        If it is not a known entity instance, add it to the method_calls list.
-        If it is not being called, add it to the attributes_accessed list.
-        """
-        for child in ast.iter_child_nodes(node):
-            self._add_to_path(node, child, "attribute")
-        attr = node.attr
-        self._handle_assignment(node, attr)
-        if node._path and node._path[-1] == "call":
-            # something is being called
-            if attr in self.known_entities:
-                # an entity is being instaced
-                self.interests["entity_instance"].append(attr)
-                self.interests["attributes_accessed"].append(ast.unparse(node).strip())
+        assignment = interests["assignment"]
+        # (node, role, in assignment, in assignment value)
+        stack = [(statement, None, False, False)]
+        while stack:
+            node, role, in_assignment, in_value = stack.pop()
+            node_type = type(node)
+            if node_type is ast.Attribute or node_type is ast.Name:
+                name = node.attr if node_type is ast.Attribute else node.id
+                if in_assignment:
+                    if role == "target":
+                        assignment[dotted_name(node)] = None
+                    elif in_value:
+                        for key, val in assignment.items():
+                            if val is None:
+                                assignment[key] = name
+                if role == "call":
+                    # something is being called
+                    if name in known_entities:
+                        # an entity is being instanced
+                        interests["entity_instance"].append(name)
+                        if node_type is ast.Attribute:
+                            interests["attributes_accessed"].append(dotted_name(node))
+                    # followed like any other call, even when named after an entity, since
+                    # it may be a helper of that name, whether or not the entity is known
+                    interests["method_calls"].append(name)
+                elif node_type is ast.Attribute:
+                    # we're an attribute of something, so store it for inspection
+                    interests["attributes_accessed"].append(name)
+                elif role == "attribute":
+                    # possible module member is being accessed
+                    interests["module_accessed"].append(name)
+                if node_type is ast.Name:
+                    continue
+                children = [(node.value, "attribute", in_assignment, in_value)]
+            elif node_type is ast.Assign:
+                children = [
+                    *((target, "target", True, in_value) for target in node.targets),
+                    (node.value, "value", True, True),
+                ]
+            elif node_type is ast.Call:
+                if role == "attribute":
+                    func = node.func
+                    if type(func) is ast.Attribute:
+                        interests["instanced"].append(func.attr)
+                    elif type(func) is ast.Name:
+                        interests["instanced"].append(func.id)
+                children = [
+                    (child, "call", in_assignment, in_value)
+                    if child is node.func
+                    else (child, None, False, False)
+                    for child in ast.iter_child_nodes(node)
+                ]
             else:
-                # not a direct entity instance, so we'll store it
-                self.interests["method_calls"].append(attr)
-        else:
-            # we're an attribute of something, so store it for inspection
-            self.interests["attributes_accessed"].append(attr)
-        ast.NodeVisitor.generic_visit(self, node)
-
-    def visit_Name(self, node):
-        for child in ast.iter_child_nodes(node):
-            self._add_to_path(node, child)
-        name = node.id
-        self._handle_assignment(node, name)
-        if node._path and node._path[-1] == "call":
-            # something is being called
-            if name in self.known_entities:
-                # an entity is being instaced
-                self.interests["entity_instance"].append(name)
-            else:
-                # not a direct entity instance, so we'll store it
-                self.interests["method_calls"].append(name)
-        elif node._path and node._path[-1] == "attribute":
-            # possible module member is being accessed
-            self.interests["module_accessed"].append(ast.unparse(node).strip())
-        ast.NodeVisitor.generic_visit(self, node)
+                children = [
+                    (child, "generic", in_assignment, in_value)
+                    for child in ast.iter_child_nodes(node)
+                ]
+            stack.extend(reversed(children))
+        return interests
 
 
 class Function:
+    __slots__ = (
+        "ast",
+        "parent_parser",
+        "location",
+        "lineno",
+        "parent_class",
+        "name",
+        "full_name",
+        "is_test",
+        "is_fixture",
+        "covers",
+        "calls",
+        "fixtures",
+        "args",
+        "decs",
+    )
+
     def __init__(self, ast, parent_parser, location=None, **kwargs):
         self.ast = ast
         self.parent_parser = parent_parser
+        self.lineno = ast.lineno
         self.location = location or self.parent_parser.code_file.name
         self.parent_class = kwargs.get("parent_class")
         self.name = self.is_test = self.is_fixture = None
@@ -131,25 +161,28 @@ class Function:
         if self.parent_parser.methods.get(self.name):
             del self.parent_parser.methods[self.name]
 
+    def copy(self):
+        """Return a copy that can gain coverage without changing the original."""
+        func = copy.copy(self)
+        func.covers, func.calls, func.fixtures = (
+            set(self.covers),
+            set(self.calls),
+            set(self.fixtures),
+        )
+        return func
+
+    def release(self):
+        """Drop the syntax tree and parser, once only the results are needed.
+
+        Functions kept beyond their file's parse, in module summaries and the
+        fixture graph, would otherwise keep every node and parser state alive.
+        """
+        self.ast = self.parent_parser = None
+        self.decs = []
+
     def _find_entity(self, line):
         """Search through all known entities and return all matches."""
-        found = []
-        for entity in self.parent_parser.entities:
-            if entity in line:
-                found.append(entity)
-            elif self.parent_parser._search_aggressiveness != "low":
-                variants = gen_variants(entity)
-                upper_line = line.upper()
-                lower_line = line.lower()
-                for variant in variants:
-                    if found:
-                        continue
-                    if variant in line:
-                        found.append(entity)
-                    elif self.parent_parser._search_aggressiveness == "high":
-                        if variant in upper_line or variant in lower_line:
-                            found.append(entity)
-        return found
+        return self.parent_parser.entity_matcher.find(line)
 
     def _find_decorators(self):
         """Find all decorators attached to this function."""
@@ -179,33 +212,47 @@ class Function:
         self.args = {arg.arg for arg in self.ast.args.args}
         known_vars = {}
         logger.debug(f"Parsing method ast {self}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        # a line can only mention an entity if the function's source does
+        func_source = self.parent_parser.source_of(self.ast)
+        may_have_entities = func_source is None or bool(self._find_entity(func_source))
+        analyzer = BodyAnalyzer()
         for line_node in self.ast.body:
-            unparsed_line = ast.unparse(line_node)
-            logger.debug(f"Investigating line: {unparsed_line}")
-            known_entities = self._find_entity(unparsed_line)
+            unparsed_line = LazySource(line_node)
+            if debug:
+                logger.debug(f"Investigating line: {unparsed_line}")
+            known_entities = (
+                self._find_entity(str(unparsed_line)) if may_have_entities else []
+            )
             # parse the line and find the interests
-            line_parser = NodeParser(known_entities=known_entities)
-            line_parser.visit(line_node)
-            logger.debug(f"Found interests {line_parser.interests}")
+            interests = analyzer.analyze(line_node, known_entities)
+            logger.debug(f"Found interests {interests}")
             # check to see if an entity was instanced and/or assigned to a variable
-            for entity in line_parser.interests["entity_instance"]:
+            for entity in interests["entity_instance"]:
                 if self.parent_parser.create_on_instance:
                     self.covers.add(f"{entity} create")
-                for key, val in line_parser.interests["assignment"].items():
+            # a variable holds whatever was instanced, entity or not, so what it
+            # holds doesn't depend on which other entities are known
+            if interests["instanced"]:
+                instanced = interests["instanced"][0]
+                for key, val in interests["assignment"].items():
                     if val in ("create", "update", "info", "read"):
-                        known_vars[key] = entity
+                        if instanced in known_entities:
+                            known_vars[key] = instanced
+                        else:
+                            known_vars.pop(key, None)
             # catch the rest just in case we miss an entity instance
             for entity in [*known_entities, *known_vars]:
                 if (
-                    entity in line_parser.interests["method_calls"]
+                    entity in interests["method_calls"]
                     and self.parent_parser.create_on_instance
                 ):
                     self.covers.add(f"{entity} create")
             # check for method calls
-            for meth_call in line_parser.interests["method_calls"]:
+            for meth_call in interests["method_calls"]:
                 if (
-                    not line_parser.interests["module_accessed"]
-                    and not line_parser.interests["attributes_accessed"]
+                    not interests["module_accessed"]
+                    and not interests["attributes_accessed"]
                     and meth_call not in python_importer.BUILTINS
                 ):
                     # a non-external method is being called
@@ -213,7 +260,7 @@ class Function:
                 else:
                     found = False
                     # test for the method being a member of a module. module.method()
-                    for module in line_parser.interests["module_accessed"]:
+                    for module in interests["module_accessed"]:
                         # We need to resolve uses of self and cls
                         if module in ["self", "cls"] and self.parent_class:
                             #  logger.warning(f"class name: {class_name}, meth call: {meth_call}")
@@ -251,7 +298,7 @@ class Function:
                             break
                         # if it isn't a direct member, see if it is related
                         # entity.something.method()
-                        for attr in line_parser.interests["attributes_accessed"]:
+                        for attr in interests["attributes_accessed"]:
                             # We need to resolve uses of self and cls
                             if attr in ["self", "cls"]:
                                 if (
@@ -315,6 +362,121 @@ class Function:
             )
 
 
+_EMPTY = frozenset()  # shared by every summary with nothing in one of its sets
+
+
+def _frozen(items, convert=None):
+    if not items:
+        return _EMPTY
+    return frozenset(map(convert, items) if convert else items)
+
+
+class FunctionSummary:
+    """A serializable record of a parsed Function's results, without its AST or parser.
+
+    Summaries are never changed once made, so their sets are frozen, and the
+    many empty ones are all the same object. Features are interned, so the many
+    tests covering a feature share one string for it.
+    """
+
+    __slots__ = (
+        "full_name",
+        "name",
+        "location",
+        "parent_class",
+        "is_test",
+        "is_fixture",
+        "args",
+        "covers",
+        "calls",
+        "fixtures",
+    )
+
+    def __init__(self, full_name, name, location=None, parent_class=None, **kwargs):
+        self.full_name = full_name
+        self.name = name
+        self.location = location
+        self.parent_class = parent_class
+        self.is_test = kwargs.get("is_test") or False
+        self.is_fixture = kwargs.get("is_fixture") or False
+        self.args = _frozen(kwargs.get("args"))
+        self.covers = _frozen(kwargs.get("covers"), FeatureTable.intern)
+        self.calls = _frozen(kwargs.get("calls"))
+        self.fixtures = _frozen(kwargs.get("fixtures"))  # {fixture name}
+
+    @classmethod
+    def from_function(cls, func, keep=None):
+        """Summarize a Function, keeping only the features keep is true for, if given."""
+        return cls(
+            full_name=func.full_name,
+            name=func.name,
+            location=func.location,
+            parent_class=func.parent_class,
+            is_test=func.is_test,
+            is_fixture=func.is_fixture,
+            args=func.args,
+            covers={cov for cov in func.covers if keep(cov)} if keep else func.covers,
+            calls={getattr(call, "full_name", call) for call in func.calls},
+            fixtures={fixture.name for fixture in func.fixtures},
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        return {
+            "full_name": self.full_name,
+            "name": self.name,
+            "location": self.location,
+            "parent_class": self.parent_class,
+            "is_test": self.is_test,
+            "is_fixture": self.is_fixture,
+            "args": sorted(self.args),
+            "covers": sorted(self.covers),
+            "calls": sorted(self.calls),
+            "fixtures": sorted(self.fixtures),
+        }
+
+
+class ModuleSummary:
+    """Everything an imported module defines, analyzed once for a given depth.
+
+    Summaries are shared by every file importing the module, so they are built
+    only from the module's own code and imports, never from the importer's.
+    """
+
+    def __init__(self, module_parser, files, unresolved):
+        self.path = module_parser.code_file
+        self.methods = dict(module_parser.methods)
+        # top-level functions, and anything the module imported, by the name it is used as
+        self.functions = {
+            name: func
+            for name, func in self.methods.items()
+            if isinstance(func, Function) and ":" not in name
+        }
+        for func in self.methods.values():
+            if (
+                isinstance(func, Function)
+                and func.parent_parser is module_parser
+                and not func.parent_class
+            ):
+                self.functions[func.name] = func
+        for func in self.methods.values():
+            if isinstance(func, Function):
+                func.release()
+        self.files = files  # every file parsed to build this summary
+        self.unresolved = unresolved  # every import that couldn't be found while building it
+
+    def find(self, name):
+        """Return what the module has under a name, falling back to a partial match."""
+        if name in self.functions:
+            return self.functions[name]
+        for full_name, contents in self.methods.items():
+            if name in full_name:
+                return contents
+
+
 class CodeParser:
     def __init__(self, code_file, parent_parser, **kwargs):
         self.code_file = Path(code_file)
@@ -322,17 +484,24 @@ class CodeParser:
         self.create_on_instance = parent_parser.create_on_instance
         self.max_depth = parent_parser.max_depth
         self.entities = parent_parser.entities
+        self.entity_matcher = parent_parser.entity_matcher
         self._curr_depth = kwargs.get("curr_depth", 0)
-        self._search_aggressiveness = kwargs.get("search_aggressiveness", "low")
         self._to_investigate = set()  # {"module", "module attr call"}
         self.import_manager = python_importer.ImportManager
-        self.imports = {}  # {import_name: (module, <real_name>)}
+        self.imports = {}  # {import_name: (module, <real_name>)}, as imported by this file
         # {class_name: {bases: [bases], methods: [{method_name: method_ast}]}}
         # {method_name: Function}
         # {test_name: Function}
         self.classes, self.methods, self.covers = {}, {}, {}
+        self._source_lines = []
+        self._local_defs = set()  # ids of the function nodes defined in this file
         code_parser.PARSED_FILES.append(code_file)
 
+    def source_of(self, func_ast):
+        """Return the source lines of a function defined in this file, if it was."""
+        if id(func_ast) in self._local_defs:
+            return "".join(self._source_lines[func_ast.lineno - 1 : func_ast.end_lineno])
+
     @staticmethod
     def _find_all(needle, haystack):
         if isinstance(needle, dict):
@@ -378,6 +547,7 @@ class CodeParser:
             if isinstance(node, ast.ClassDef):
                 self._parse_class_ast(node, parents=f"{parents}.{class_ast.name}")
             elif isinstance(node, ast.AsyncFunctionDef | ast.FunctionDef):
+                self._local_defs.add(id(node))
                 class_func = Function(node, self, parent_class=class_ast.name)
                 self.classes[class_ast.name]["methods"].append(class_func)
                 #   self.methods[node.name] = node
@@ -391,146 +561,199 @@ class CodeParser:
         if not self.code_file.exists():
             logger.warning(f"{self.code_file} does not exist!")
             return
-        with self.code_file.open() as py_file:
-            try:
-                file_ast = ast.parse(py_file.read())
-            except UnicodeDecodeError:
-                logger.warning(f"Unable to parse {self.code_file.absolute()}")
-                return
+        source = SourceCache.get(self.code_file)
+        try:
+            file_ast = source.tree
+        except UnicodeDecodeError:
+            logger.warning(f"Unable to parse {self.code_file.absolute()}")
+            return
+        self._source_lines = source.lines
         # move through all high level nodes
         for node in file_ast.body:
             if isinstance(node, ast.ImportFrom):
                 for name in node.names:
                     if name.asname:  # if using import something as another_name
-                        self.import_manager.register(
-                            name.asname, node.__dict__.get("module"), name.name
-                        )
+                        self._register(name.asname, node.__dict__.get("module"), name.name)
                     else:
-                        self.import_manager.register(
-                            name.name, node.__dict__.get("module")
-                        )
+                        self._register(name.name, node.__dict__.get("module"))
             elif isinstance(node, ast.Import):
                 # regular imports are pretty similar, but still different enough
                 for name in node.names:
                     if name.asname:
                         # this will make sense later...
-                        self.import_manager.register(name.asname, name.name)
+                        self._register(name.asname, name.name)
                     else:
-                        self.import_manager.register(name.name)
+                        self._register(name.name)
             elif isinstance(node, ast.ClassDef):
                 self._parse_class_ast(node)
             elif isinstance(node, ast.AsyncFunctionDef | ast.FunctionDef):
                 # if "test_" in node.name:
                 #     self.tests[node.name] = None
+                self._local_defs.add(id(node))
                 self.methods[node.name] = node
 
-    def _parse_import(self, import_name):
-        """Parse through the import's file and get any coverage out of it."""
-        if self._curr_depth >= self.max_depth:
-            logger.debug(f"Max depth of {self.max_depth} has been reached!")
-            return
-        # if not, try to fall back to the file itself
-        file_path = self.import_manager.get_file(import_name)
-        if not file_path or file_path in code_parser.PARSED_FILES:
-            # logger.error(f'No file for {import_name}: tried: {file_path}')
-            return
-        # logger.error(f'Found file for {import_name}: {file_path}')
-        # pass the file on to a new parser
+    def _register(self, import_name, module_name=None, real_name=None):
+        """Record an import of this file.
+
+        Only top-level files share their imports with the ImportManager. Imported
+        modules are summarized once for every importer, so they must not leak theirs.
+        """
+        self.imports[import_name] = (module_name, real_name)
+        if not self._curr_depth:
+            self.import_manager.register(import_name, module_name, real_name)
+
+    def _summarize(self, file_path):
+        """Return the summary of an imported module, analyzing it on first use."""
+        key = (file_path, self.max_depth - self._curr_depth - 1)
+        if summary := self.import_manager.module_summaries.get(key):
+            # results built on the summary depend on the files it came from
+            code_parser.PARSED_FILES.extend(summary.files)
+            code_parser.UNRESOLVED.extend(summary.unresolved)
+            return summary
+        first_file, first_unresolved = len(code_parser.PARSED_FILES), len(code_parser.UNRESOLVED)
         py_parser = CodeParser(
             code_file=file_path,
             parent_parser=self.parent_parser,
             curr_depth=self._curr_depth + 1,
         )
         py_parser.parse()
-        # then get the results
-        if import_name in py_parser.methods:
-            self.import_manager.add_methods(
-                import_name, py_parser.methods[import_name]
-            )
-            self.methods[import_name] = py_parser.methods[import_name]
+        summary = ModuleSummary(
+            py_parser,
+            code_parser.PARSED_FILES[first_file:],
+            code_parser.UNRESOLVED[first_unresolved:],
+        )
+        self.import_manager.module_summaries[key] = summary
+        return summary
+
+    def _investigate_import(self, subject):
+        """Look for a subject in this file's imports, or any known import if top-level."""
+        if subject in self.imports:
+            self._parse_import(subject)
+        elif not self._curr_depth:
+            methods = self.import_manager.get_methods(subject)
+            if not methods or subject not in methods:
+                self._parse_import(subject)
+
+    def _parse_import(self, import_name):
+        """Get any coverage for an import out of its module's summary."""
+        if self._curr_depth >= self.max_depth:
+            logger.debug(f"Max depth of {self.max_depth} has been reached!")
+            return
+        if is_local := import_name in self.imports:
+            module_name, real_name = self.imports[import_name]
+            file_path = self.import_manager.locate(import_name, module_name, real_name)
+            name = real_name or import_name
+            target = ".".join(filter(None, (module_name, name)))
         else:
-            logger.error(f"{import_name} not in {py_parser.methods}")
-            for meth, contents in py_parser.methods.items():
-                if import_name in meth:
-                    self.import_manager.add_methods(import_name, contents)
-                    self.methods[import_name] = contents
-                    return
-            self.import_manager.add_methods(import_name, py_parser.methods)
+            file_path = self.import_manager.get_file(import_name)
+            name = target = import_name
+        if not file_path:
+            # results without it would change if a module it points to were added
+            code_parser.UNRESOLVED.append(target)
+            return
+        if file_path == self.code_file:
+            return
+        if scope := self.parent_parser.diff_scope:
+            reaches, checked = scope.reach(file_path, self.max_depth - self._curr_depth - 1)
+            if not reaches:
+                logger.debug(f"Skipping {file_path}, which can't reach any diff entity")
+                # results left without the module still depend on what it imports
+                code_parser.PARSED_FILES.extend(checked)
+                return
+        summary = self._summarize(file_path)
+        if (contents := summary.find(name)) is None:
+            logger.error(f"{name} not in {summary.path}")
+            if not is_local:
+                self.import_manager.add_methods(import_name, summary.methods)
+            return
+        if isinstance(contents, Function):
+            # coverage gained by this file must not change the shared summary
+            contents = contents.copy()
+        if not is_local:
+            self.import_manager.add_methods(import_name, contents)
+        self.methods[import_name] = contents
 
     def _match_fixtures(self):
-        """Match a method's args to available fixtures."""
-        fixtures = {meth.name: meth for meth in self.methods.values() if meth.is_fixture}
+        """Match a method's args to available fixtures, adding what they cover.
+
+        This file's own fixtures shadow those of conftests and plugins. Fixtures
+        requested by fixtures are followed by the fixture graph.
+        """
+        graph = self.parent_parser.fixture_handler.graph
+        graph.set_module_fixtures(
+            self.code_file, [meth for meth in self.methods.values() if meth.is_fixture]
+        )
+        module_scope = graph.visible_scopes(self.code_file)[0]
         for method in self.methods.values():
             for arg in method.args:
-                if fixture := fixtures.get(arg):
-                    method.fixtures.add(fixture)
-                    method.covers.update(fixture.covers)
-                elif fixture := self.parent_parser.fixture_handler.fixtures.get(arg):
+                # a fixture overriding another of its name requests that one
+                overrides = method.is_fixture and arg == method.name
+                if found := graph.find(arg, self.code_file, module_scope if overrides else None):
+                    scope, fixture = found
                     method.fixtures.add(fixture)
-                    method.covers.update(fixture.covers)
+                    method.covers.update(graph.coverage(scope, fixture.name))
+
+    def _queue_calls(self, func):
+        """Queue the calls of one of this file's functions to be investigated."""
+        for call in func.calls:
+            if not isinstance(call, Function):
+                logger.debug(f"Adding {call} to investigation list")
+                self._to_investigate.add(call)
+
+    def _investigate(self, subjects):
+        """Resolve a single name, returning a function of this file it turned into, if any."""
+        subject = subjects.split()[-1]
+        logger.debug(f"Investigating {subjects}")
+        if subject in self.methods and self.methods.get(subject) != "stdlib":
+            # it is something we've already recorded
+            if isinstance(self.methods[subject], ast.AST):
+                # this is a non-parsed method, so let's parse it
+                logger.debug(f"Parsing non-parsed method {subject}")
+                return Function(self.methods[subject], self)
+            elif not isinstance(self.methods[subject], Function):
+                # we don't know anything about this. time to check imports
+                logger.debug(f"Checking imports for {subject}")
+                self._investigate_import(subject)
+        else:
+            # we've not recorded it, so we'll investigate
+            logger.debug(f"Checking imports for {subject}")
+            self._investigate_import(subject)
 
     def _perform_investigations(self):
-        """Check through the investigation list and try to draw conclusions."""
+        """Investigate every unresolved name, following what each turns up, until none are left.
+
+        The worklist starts with this file's unparsed functions, the calls of its
+        parsed ones and anything they already asked for. Each name is investigated
+        once. Functions parsed along the way add their calls, and whatever they
+        ask for themselves. Imported functions are taken from their module's
+        summary, whose coverage already includes what they call, so their calls
+        aren't followed from here.
+        """
         logger.debug("Resolving all imports")
         self.import_manager.resolve_all()
-        # gather all unresolved method calls
         for meth, values in self.methods.items():
-            # first, determine if the current method needs to be added
-            if values == "stdlib" or meth in self._to_investigate:
-                # we can skip both of these right off
+            if values == "stdlib":
                 continue
-            elif not isinstance(values, Function):
-                # we definitely need to investigate this
+            if isinstance(values, Function):
+                self._queue_calls(values)
+            else:
                 logger.debug(f"Adding {meth} to investigation list")
                 self._to_investigate.add(meth)
-            # next, we need to determine if the method's calls need to be added
-            elif isinstance(values, Function) and values.calls:
-                for call in values.calls:
-                    if isinstance(call, Function):
-                        continue
-                    meth_call = call.split()[-1]
-                    if (
-                        meth_call not in self.methods.items()
-                        and meth_call not in self._to_investigate
-                    ):
-                        logger.debug(f"Adding {call} to investigation list")
-                        self._to_investigate.add(call)
-        # now to carry on all of our investigations!
-        for subjects in self._to_investigate.copy():  # copy to avoid size change
-            subject = subjects.split()[-1]
-            logger.debug(f"Investigating {subjects}")
-            if (
-                subject in self.methods
-                and self.methods.get(subject) != "stdlib"
-            ):
-                # it is something we've already recorded
-                if "ast." in str(type(self.methods[subject])):
-                    # this is a non-parsed method, so let's parse it
-                    logger.debug(f"Parsing non-parsed method {subject}")
-                    Function(self.methods[subject], self)
-                elif not isinstance(self.methods[subject], Function):
-                    # we don't know anything about this. time to check imports
-                    logger.debug(f"Checking imports for {subject}")
-                    methods = self.import_manager.get_methods(subject)
-                    if not methods or subject not in methods:
-                        self._parse_import(subject)
-            else:
-                # we've not recorded it, so we'll investigate
-                logger.debug(f"Checking imports for {subject}")
-                methods = self.import_manager.get_methods(subject)
-                if not methods or subject not in methods:
-                    self._parse_import(subject)
-            self._to_investigate.remove(subjects)
+        investigated = set()
+        while self._to_investigate:
+            subjects = self._to_investigate.pop()
+            if subjects in investigated:
+                continue
+            investigated.add(subjects)
+            if func := self._investigate(subjects):
+                self._queue_calls(func)
 
     def parse(self):
         """Main method that runs everything."""
         self._parse_file()
         self._perform_investigations()
-        max_loops, loop_num = 10, 0
-        while self._to_investigate and loop_num < max_loops:
-            self._perform_investigations()
-            loop_num += 1
         # finally we resolve all the coverage we can
+        call_graph = CallGraph(self.methods)
         for method in self.methods:
             # add any coverage from known matching imports
             if not isinstance(self.methods[method], Function):
@@ -546,12 +769,7 @@ class CodeParser:
                     # if isinstance(call_cov, dict) and call_cov.get("covers"):
                     #     self.methods[method]["covers"].append(call_cov)
                     self.methods[method].covers.update(call.covers)
-            try:
-                self.methods[method].covers.update(get_coverage(method, self.methods))
-            except RecursionError:
-                logger.warning(
-                    f"Max recursion depth reached when compiling coverage for {method}."
-                )
+            self.methods[method].covers.update(call_graph.coverage(method))
         # attempt to resolve fixture coverage
         self._match_fixtures()
         # if logger.level == 10:
@@ -0,0 +1,104 @@
+"""Read and parse every source file once, sharing the results between parsers."""
+import ast
+from collections import OrderedDict
+import os
+from pathlib import Path
+
+MAX_TREES = 512  # syntax trees are large, so only the most recently used are kept
+
+
+class SourceFile:
+    """The text of a file as read, with its lines and syntax tree built when first needed."""
+
+    def __init__(self, path, stat, data):
+        self.path = path
+        self.stat = stat  # (mtime, size) when read
+        self.data = data  # the raw bytes, only until decoded
+        self._text = self._lines = self._tree = None
+
+    @property
+    def text(self):
+        """The decoded text, with universal newlines like a file opened in text mode."""
+        if self._text is None:
+            text = self.data.decode()
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            self._text, self.data = text, None
+        return self._text
+
+    def search(self, pattern):
+        """Check for a compiled bytes pattern, searching the raw bytes if not yet decoded."""
+        data = self.data if self.data is not None else self.text.encode()
+        return pattern.search(data) is not None
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            self._lines = self.text.splitlines(keepends=True)
+        return self._lines
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = ast.parse(self.text)
+        return self._tree
+
+    def drop_derived(self):
+        """Free the lines and tree, keeping the text they can be rebuilt from."""
+        self._lines = self._tree = None
+
+
+class SourceCache:
+    """Every source file read in this process, by absolute path.
+
+    A file is read again only if its modification time or size changed. The
+    text of every file is kept, but only the lines and syntax trees of the most
+    recently used files, so a large test tree doesn't hold every tree at once.
+    """
+
+    def __init__(self, max_trees=MAX_TREES):
+        self.max_trees = max_trees
+        self._files = {}  # {absolute path: SourceFile}
+        self._recent = OrderedDict()  # {absolute path: None}, least recently used first
+
+    def get(self, file_path):
+        """Return the SourceFile for a path, raising OSError if it can't be read."""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        stat = (stat.st_mtime_ns, stat.st_size)
+        source = self._files.get(path)
+        if source is None or source.stat != stat:
+            source = self._files[path] = SourceFile(path, stat, Path(path).read_bytes())
+            self._recent.pop(path, None)
+        self._recent[path] = None
+        self._recent.move_to_end(path)
+        while len(self._recent) > self.max_trees:
+            old_path, _ = self._recent.popitem(last=False)
+            self._files[old_path].drop_derived()
+        return source
+
+    def read_text(self, file_path):
+        return self.get(file_path).text
+
+    def parse(self, file_path):
+        """Return the syntax tree of a file."""
+        return self.get(file_path).tree
+
+    def release(self, file_path):
+        """Free a file's lines and syntax tree, keeping its text."""
+        if source := self._files.get(os.path.abspath(file_path)):
+            source.drop_derived()
+
+    def discard(self, file_path):
+        """Forget a file that won't be needed again."""
+        path = os.path.abspath(file_path)
+        self._files.pop(path, None)
+        self._recent.pop(path, None)
+
+    def clear(self):
+        self._files.clear()
+        self._recent.clear()
+
+
+# Force singleton behavior
+SourceCache = SourceCache()
@@ -1,3 +1,5 @@
+import os
+import sys
 from functools import cache
 from pathlib import Path
 
@@ -19,15 +21,40 @@ class SourcePath:
         return FINDERS[base_path]
 
     def __init__(self, base_path=None):
+        if getattr(self, "base_path", None):
+            return  # an existing finder, whose index is already built
         self.base_path = (Path(base_path) if base_path else Path.cwd()).absolute()
-        self.all_modules = helpers.recurse_down(self.base_path, ".py")
+        self._build_index()
+
+    def _build_index(self):
+        """Walk the base path once, indexing every module by path, stem and dotted name."""
+        self._files = set()  # {str(absolute path)}
+        self.stems = {}  # {stem: [paths]}
+        self.modules = {}  # {dotted name relative to base path: path}
+        # modules git ignores or exclude_files skips may still be imported,
+        # generated ones or those of a virtualenv for instance
+        for module in helpers.recurse_down(self.base_path, ".py", exclude=[], gitignore=False):
+            self._files.add(str(module))
+            self.stems.setdefault(module.stem, []).append(module)
+            parts = module.relative_to(self.base_path).with_suffix("").parts
+            if parts[-1] == "__init__":
+                # modules take precedence over packages of the same name
+                if parts[:-1]:
+                    self.modules.setdefault(".".join(parts[:-1]), module)
+            else:
+                self.modules[".".join(parts)] = module
+
+    def _is_module(self, path):
+        """Check for a source file, using the index for anything under the base path."""
+        path = Path(os.path.abspath(path))
+        if path.is_relative_to(self.base_path):
+            return str(path) in self._files
+        return path.is_file()
 
-    @cache
     def _find_relative_from_base(self, rel_path):
         """Search for a relative path down from the base path."""
-        for module in self.all_modules:
-            if module.stem == rel_path:
-                return module
+        if found := self.stems.get(rel_path):
+            return found[0]
 
     @cache
     def find(self, name, rel_path=None):
@@ -41,7 +68,9 @@ class SourcePath:
             "..my_subsubmodule"
         """
         rel_path = Path(rel_path) if rel_path else self.base_path
-        if rel_path.is_file():
+        if rel_path == self.base_path and (found := self.modules.get(name)):
+            return found
+        if self._is_module(rel_path):
             rel_path = rel_path.parent
         logger.debug(f"looking for {name} in {rel_path}")
         if name.startswith("."):
@@ -55,19 +84,21 @@ class SourcePath:
         as_path = name.replace(".", "/")
         # check if the path exists as a file (module)
         resolved_path = rel_path / f"{as_path}.py"
-        if resolved_path.exists():
+        if self._is_module(resolved_path):
             logger.debug(f"found module {resolved_path}")
             return resolved_path
         # check if the path exists as a package (__init__.py)
         init_path = rel_path / as_path / "__init__.py"
-        if init_path.exists():
+        if self._is_module(init_path):
             logger.debug(f"found package {init_path}")
             return init_path
         # could be an attribute of its parent module, check there
-        if (fpath := resolved_path.parent.with_suffix(".py")).exists():
+        if resolved_path.parent.name and self._is_module(
+            fpath := resolved_path.parent.with_suffix(".py")
+        ):
             return fpath
         # could be an attribute of its parent package, check there
-        if (fpath := resolved_path.parent.parent / "__init__.py").exists():
+        if self._is_module(fpath := resolved_path.parent.parent / "__init__.py"):
             return fpath
         # if the top level name matches our base path name, strip it and try again
         if name.startswith(self.base_path.name):
@@ -75,18 +106,30 @@ class SourcePath:
 
     @classmethod
     def from_module(cls, module_name):
-        import sys
-
-        for path in sys.path:
-            if "site-packages" not in path:
-                continue
-            # check if a directory exists with the module name
-            if (module_path := Path(path) / module_name).exists():
-                return cls(module_path)
-        # check if the module is relative to the current directory
-        if ((module_path := Path.cwd() / module_name) / "__init__.py").exists():
-            return cls(module_path)
-        raise ModuleNotFoundError(f"Unable to find module {module_name}")
+        return cls(_find_module_root(module_name, Path.cwd()))
+
+
+def clear_finders():
+    """Forget every finder and every file found, so changes on disk are picked up."""
+    FINDERS.clear()
+    SourcePath.find.cache_clear()
+    _find_module_root.cache_clear()
+    find_file_from_import.cache_clear()
+
+
+@cache
+def _find_module_root(module_name, cwd):
+    """Find the directory of an installed or local top-level module."""
+    for path in sys.path:
+        if "site-packages" not in path:
+            continue
+        # check if a directory exists with the module name
+        if (module_path := Path(path) / module_name).exists():
+            return module_path
+    # check if the module is relative to the current directory
+    if ((module_path := cwd / module_name) / "__init__.py").exists():
+        return module_path
+    raise ModuleNotFoundError(f"Unable to find module {module_name}")
 
 
 @cache
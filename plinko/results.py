@@ -0,0 +1,73 @@
+"""Stream results to JSON lines as each test file is done, instead of keeping them in memory."""
+import json
+from pathlib import Path
+
+from logzero import logger
+
+from plinko import helpers
+
+
+class ResultStream:
+    """The tests of every parsed file, written as one JSON line per file once it is done.
+
+    Each line maps the file's tests to everything they cover, or to an empty list:
+        {"file": "tests/test_host.py", "tests": {"test_host.py:test_create": ["Host create"]}}
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text("")
+        self._stream = None
+        self.files = 0
+
+    def write(self, file_path, summaries):
+        if self._stream is None:
+            self._stream = self.path.open("a")
+        tests = {summ.full_name: sorted(summ.covers) for summ in summaries if summ.is_test}
+        self._stream.write(json.dumps({"file": str(file_path), "tests": tests}) + "\n")
+        self.files += 1
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def records(self):
+        """Yield every record written so far, reading them back one at a time."""
+        self.close()
+        with self.path.open() as stream:
+            for line in stream:
+                yield json.loads(line)
+
+
+def write_reports(projected, report_dir, minimal=False):
+    """Write the reports for streamed results, as they are projected file by file.
+
+    projected yields the (cov_tests, miss_tests) of each test file. Both reports
+    are JSON lines, one test per line. Only the first test seen for each distinct
+    coverage is kept to choose the minimal tests from, since SetCover always
+    prefers it over later tests covering exactly the same.
+    """
+    report_dir = Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    cov_path = report_dir / "test-coverage.jsonl"
+    miss_path = report_dir / "test-no-coverage.jsonl"
+    distinct = {}  # {coverage: first test covering exactly that}
+    with cov_path.open("w") as cov_file, miss_path.open("w") as miss_file:
+        for cov_tests, miss_tests in projected:
+            for test, covers in cov_tests.items():
+                cov_file.write(json.dumps({"test": test, "covers": sorted(covers)}) + "\n")
+                distinct.setdefault(frozenset(covers), test)
+            for test in miss_tests:
+                miss_file.write(json.dumps({"test": test}) + "\n")
+    logger.info(f"Saved tests with coverage to {cov_path.absolute()}")
+    logger.info(f"Saved tests without coverage to {miss_path.absolute()}")
+    if minimal:
+        helpers.write_to_file(
+            helpers.expand_dict_keys(
+                helpers.get_min_tests({test: set(covers) for covers, test in distinct.items()})
+            ),
+            report_dir / "min-tests.yaml",
+            "minimal tests",
+        )
@@ -0,0 +1,222 @@
+"""Keep a test directory parsed in a long running process, queried over a Unix socket.
+
+Requests and responses are single lines of JSON. Every request names an operation:
+    {"op": "query", "diff": "/path/to/6.16.0-comp.yaml", "behavior": "minimal"}
+    {"op": "query", "entity_methods": {"hosts": ["create", "update"]}}
+    {"op": "query", "features": ["Host create"]}
+    {"op": "status"}
+    {"op": "stop"}
+Every response has "ok", along with either the results or an "error".
+"""
+import json
+import os
+from pathlib import Path
+import socket
+import socketserver
+
+from logzero import logger
+
+from plinko import code_parser, helpers
+from plinko.cache import hash_file
+from plinko.config import PLINKO_DATA_DIR
+
+SOCKET_PATH = PLINKO_DATA_DIR / "plinko.sock"
+
+
+class AnalysisState:
+    """The results for a test directory, kept up to date with the files on disk.
+
+    Before answering a query, every test file and every file their results used
+    is checked. Only files whose size or modification time changed are hashed,
+    and the test files affected by those that really changed are parsed again.
+    A new or removed conftest affects every test beneath it, and a new module in
+    the test directory affects the tests with an import it may now satisfy.
+    Entities not yet parsed for are added by parsing the directory for the old
+    and new entities together, leaning on the parse cache and code index.
+    """
+
+    def __init__(self, test_directory, name=None, **parser_kwargs):
+        self.test_directory = Path(test_directory)
+        self.name = name
+        self.parser_kwargs = parser_kwargs
+        self.parser = None
+        self._stats = {}  # {file: ((mtime, size), sha256)}
+
+    def _known_files(self):
+        files = {str(path.absolute()) for path in self.parser._test_files(self.test_directory)}
+        for file_path, dependencies in self.parser.file_dependencies.items():
+            files.add(file_path)
+            files.update(dependencies)
+        return files
+
+    def _changed_files(self):
+        """Return the files that changed since last checked, recording their current state."""
+        files, changed = self._known_files(), set()
+        for file_path in files | set(self._stats):
+            try:
+                stat = os.stat(file_path)
+                stat = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stat = None
+            old_stat, old_hash = self._stats.get(file_path, (None, None))
+            if file_path in self._stats and stat == old_stat:
+                continue
+            file_hash = hash_file(file_path) if stat else None
+            if file_path not in self._stats or file_hash != old_hash:
+                changed.add(file_path)
+            self._stats[file_path] = (stat, file_hash)
+        for file_path in set(self._stats) - files:
+            del self._stats[file_path]
+        return changed
+
+    def _parse(self, entity_methods):
+        code_parser.reset_parse_state()
+        self.parser = code_parser.CodeParser(
+            entity_methods=entity_methods, dump_entities=False, **self.parser_kwargs
+        )
+        self.parser.parse_directory(self.test_directory)
+        self._changed_files()  # record what the results were parsed from
+
+    def refresh(self, entity_methods=None):
+        """Bring the results up to date with the files on disk and the given entities."""
+        known = self.parser.ent_meth_dict if self.parser else {}
+        merged = helpers.merge_diff_dicts([known, entity_methods or {}])
+        if self.parser is None or merged != known:
+            logger.info(f"Parsing {self.test_directory} for {len(merged)} entities")
+            self._parse(merged)
+        elif changed := self._changed_files():
+            logger.info(f"{len(changed)} files changed; updating the results")
+            stored = self.parser._index_results()
+            code_parser.reset_parse_state()
+            self.parser.update_results(self.test_directory, stored, changed)
+
+    def diff_entities(self, diff_path):
+        entity_methods = helpers.get_diff_dict(diff_path, flatten=False)
+        if entity_methods is None:
+            raise ValueError(f"Unable to load {diff_path}; expected a compact diff file")
+        helpers.del_from_iter(self.name, entity_methods)
+        return entity_methods
+
+    def feature_entities(self, features):
+        """Return the parsed entities, with their methods, that some features belong to.
+
+        Feature names only hold the normalized entity names, so features of entities
+        that weren't parsed for can't be told apart from unknown ones.
+        """
+        entity_map = self.parser.entity_map if self.parser else {}
+        entity_methods, unknown = {}, []
+        for feature in sorted(features):
+            if (entity := entity_map.get(feature.partition(" ")[0])) is None:
+                unknown.append(feature)
+            else:
+                entity_methods[entity] = self.parser.ent_meth_dict[entity]
+        if unknown:
+            raise ValueError(
+                f"No entities parsed for {', '.join(unknown)}; "
+                "query a diff or entity_methods holding them first"
+            )
+        return entity_methods
+
+    def query(self, diff=None, entity_methods=None, features=None, behavior="all"):
+        """Return the tests with and without coverage of a diff, entities or features.
+
+        Features alone are looked for among the tests of the entities they belong to.
+        """
+        if diff:
+            entity_methods = self.diff_entities(diff)
+        elif features and not entity_methods:
+            entity_methods = self.feature_entities(features)
+        self.refresh(entity_methods)
+        cov_tests, miss_tests = self.parser.project(entity_methods or self.parser.ent_meth_dict)
+        if features:
+            features = set(features)
+            miss_tests = miss_tests + [
+                test for test, covers in cov_tests.items() if not covers & features
+            ]
+            cov_tests = {
+                test: covers & features for test, covers in cov_tests.items() if covers & features
+            }
+        results = {
+            "cov_tests": {test: sorted(covers) for test, covers in cov_tests.items()},
+            "miss_tests": miss_tests,
+        }
+        if behavior == "minimal":
+            results["min_tests"] = {
+                test: sorted(covers)
+                for test, covers in helpers.get_min_tests(cov_tests).items()
+            }
+        return results
+
+    def status(self):
+        return {
+            "test_directory": str(self.test_directory.absolute()),
+            "entities": sorted(self.parser.ent_meth_dict) if self.parser else [],
+            "test_files": len(self.parser.all_methods) if self.parser else 0,
+        }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = {"ok": True, **self.server.respond(request)}
+            except Exception as err:  # a bad request must not take the server down
+                logger.exception(f"Failed to answer {line!r}")
+                response = {"ok": False, "error": f"{type(err).__name__}: {err}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class AnalysisServer(socketserver.UnixStreamServer):
+    """Answer requests about an AnalysisState, one at a time, until asked to stop."""
+
+    def __init__(self, state, socket_path=SOCKET_PATH):
+        self.state = state
+        self.socket_path = Path(socket_path)
+        self.stopped = False
+        if self.socket_path.exists():
+            try:
+                send({"op": "status"}, self.socket_path)
+            except OSError:
+                self.socket_path.unlink()  # left behind by a server that died
+            else:
+                raise RuntimeError(f"A server is already listening on {self.socket_path}")
+        super().__init__(str(self.socket_path), _RequestHandler)
+
+    def respond(self, request):
+        op = request.get("op")
+        if op == "query":
+            return self.state.query(
+                diff=request.get("diff"),
+                entity_methods=request.get("entity_methods"),
+                features=request.get("features"),
+                behavior=request.get("behavior", "all"),
+            )
+        if op == "status":
+            return self.state.status()
+        if op == "stop":
+            self.stopped = True
+            return {}
+        raise ValueError(f"Unknown operation {op!r}")
+
+    def serve(self):
+        """Handle requests until one asks the server to stop."""
+        logger.info(f"Listening on {self.socket_path}")
+        try:
+            while not self.stopped:
+                self.handle_request()
+        finally:
+            self.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+
+def send(request, socket_path=SOCKET_PATH, timeout=None):
+    """Send a request to a running server and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(socket_path))
+        with sock.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            return json.loads(stream.readline())
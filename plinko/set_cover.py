@@ -0,0 +1,74 @@
+"""Small sets of tests that still cover everything."""
+import heapq
+
+
+class SetCover:
+    """Choose a small set of tests that together cover everything the given tests cover.
+
+    Every feature is numbered and each test's coverage is kept as an int bitset,
+    so the features a test would add are a single mask and popcount away.
+    Tests are picked greedily by how many uncovered features they add. Those
+    counts only ever shrink, so stale counts in the priority queue are upper
+    bounds and only the test at the top needs rechecking (lazy greedy).
+    Afterwards, any chosen test whose features are all covered by other chosen
+    tests is dropped, tracked with a counter per feature.
+    """
+
+    def __init__(self, test_coverage):
+        self.test_coverage = test_coverage
+        self.tests = list(test_coverage)
+        self.features = {}  # {feature: id}
+        self._feature_ids = []  # [[feature ids] per test]
+        self._masks = []  # [coverage bitset per test]
+        for test in self.tests:
+            ids = [
+                self.features.setdefault(feature, len(self.features))
+                for feature in test_coverage[test] or ()
+            ]
+            mask = 0
+            for feature_id in ids:
+                mask |= 1 << feature_id
+            self._feature_ids.append(ids)
+            self._masks.append(mask)
+
+    def _greedy(self):
+        """Return the test indexes picked by the greedy pass, in the order picked."""
+        # ties go to the test with the most coverage, then to the earliest given
+        heap = [
+            (-mask.bit_count(), -mask.bit_count(), index)
+            for index, mask in enumerate(self._masks)
+        ]
+        heapq.heapify(heap)
+        covered, picked = 0, []
+        while heap:
+            neg_gain, neg_size, index = heapq.heappop(heap)
+            if not (gain := (self._masks[index] & ~covered).bit_count()):
+                continue  # adds nothing now, and never will
+            if gain == -neg_gain:
+                picked.append(index)
+                covered |= self._masks[index]
+            else:
+                heapq.heappush(heap, (-gain, neg_size, index))
+        return picked
+
+    def _drop_redundant(self, picked):
+        """Remove picked tests that only cover what other picked tests also cover."""
+        counts = [0] * len(self.features)  # {feature id: picked tests covering it}
+        for index in picked:
+            for feature_id in self._feature_ids[index]:
+                counts[feature_id] += 1
+        needed = set(picked)
+        # the last tests picked added the least, so try them first
+        for index in reversed(picked):
+            if all(counts[feature_id] > 1 for feature_id in self._feature_ids[index]):
+                needed.remove(index)
+                for feature_id in self._feature_ids[index]:
+                    counts[feature_id] -= 1
+        return [index for index in picked if index in needed]
+
+    def minimal(self):
+        """Return a dict of the chosen tests, mapped to what they cover."""
+        return {
+            self.tests[index]: self.test_coverage[self.tests[index]]
+            for index in self._drop_redundant(self._greedy())
+        }
@@ -0,0 +1,173 @@
+"""Walk directory trees lazily, skipping what git and the settings say to ignore."""
+from fnmatch import fnmatchcase
+import os
+from pathlib import Path
+import re
+
+from plinko.config import BANNED_DIRS, settings
+
+_LISTINGS = {}  # {directory: (mtime, [file names])}
+
+
+def _glob_to_regex(pattern):
+    """Translate a gitignore glob, where only ** crosses directories, into a regex."""
+    regex, index = "", 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            regex, index = regex + "(?:.*/)?", index + 3
+            continue
+        if pattern.startswith("**", index):
+            regex, index = regex + ".*", index + 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[" and (end := pattern.find("]", index + 1)) > index:
+            regex += pattern[index : end + 1].replace("[!", "[^", 1)
+            index = end
+        else:
+            regex += re.escape(char)
+        index += 1
+    return re.compile(regex + r"\Z")
+
+
+class GitIgnore:
+    """The patterns of one .gitignore file, matched against paths below its directory.
+
+    Supports comments, negation with !, directory-only patterns ending in /,
+    patterns anchored to the file's directory by a /, and ** across directories.
+    """
+
+    def __init__(self, base_dir, lines):
+        self.base_dir = str(base_dir)
+        self.rules = []  # [(regex, negated, directories only, anchored)]
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            line = line[negated:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            self.rules.append((_glob_to_regex(line.lstrip("/")), negated, dir_only, anchored))
+
+    @classmethod
+    def from_dir(cls, dir_path):
+        """Return the rules of a directory's .gitignore, or None if it has none."""
+        try:
+            with open(os.path.join(dir_path, ".gitignore"), errors="ignore") as ignore_file:
+                return cls(dir_path, ignore_file)
+        except OSError:
+            return None
+
+    def match(self, path, is_dir):
+        """Return True if ignored, False if re-included, or None if no pattern applies."""
+        rel_path = os.path.relpath(path, self.base_dir).replace(os.sep, "/")
+        name = rel_path.rsplit("/", 1)[-1]
+        result = None
+        for regex, negated, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path if anchored else name):
+                result = not negated
+        return result
+
+
+def _ignored(rules, path, is_dir):
+    """Check a path against .gitignore rules, outermost first, so the innermost decides."""
+    ignored = False
+    for rules_file in rules:
+        if (result := rules_file.match(path, is_dir)) is not None:
+            ignored = result
+    return ignored
+
+
+def _ancestor_rules(dir_path):
+    """Return the .gitignore rules above a directory, up to the root of its repository."""
+    rules, current = [], Path(dir_path).absolute()
+    for parent in current.parents:
+        if rules_file := GitIgnore.from_dir(parent):
+            rules.append(rules_file)
+        if (parent / ".git").exists():
+            break
+    else:
+        return []  # not in a repository, so nothing above applies
+    return rules[::-1]
+
+
+def _matches_any(patterns, rel_path, name):
+    return any(
+        fnmatchcase(rel_path, pattern) or fnmatchcase(name, pattern) for pattern in patterns
+    )
+
+
+def walk_files(dir_path, suffix=None, ignore=None, include=(), exclude=None, gitignore=None):
+    """Yield every file below a directory, in the order the directories list them.
+
+    Directories in BANNED_DIRS, or ignored by git, are never entered. Files must
+    match one of the include globs, if any, and neither directories nor files may
+    match an exclude glob. Globs are matched against the path relative to dir_path
+    and against the bare name. Unless given, the exclude globs and whether to
+    follow .gitignore come from the exclude_files and use_gitignore settings.
+    """
+    exclude = settings.get("exclude_files", []) if exclude is None else exclude
+    gitignore = settings.get("use_gitignore", True) if gitignore is None else gitignore
+    root = os.fspath(dir_path)
+
+    def enter(dir_path, rules):
+        """Return an iterator over a directory's entries, with the rules applying to them."""
+        try:
+            with os.scandir(dir_path) as scan:
+                entries = list(scan)
+        except OSError:
+            entries = []
+        if gitignore and any(entry.name == ".gitignore" for entry in entries):
+            rules = [*rules, GitIgnore.from_dir(dir_path)]
+        return iter(entries), rules
+
+    # depth first, entering each directory where it is listed
+    stack = [enter(root, _ancestor_rules(root) if gitignore else [])]
+    while stack:
+        entries, rules = stack[-1]
+        for entry in entries:
+            if include or exclude:
+                rel_path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+            if entry.is_dir():
+                if entry.name in BANNED_DIRS or (
+                    exclude and _matches_any(exclude, rel_path, entry.name)
+                ):
+                    continue
+                if rules and _ignored(rules, entry.path, True):
+                    continue
+                stack.append(enter(entry.path, rules))
+                break
+            if not entry.is_file():
+                continue
+            if ignore and ignore in entry.name:
+                continue
+            if suffix and os.path.splitext(entry.name)[1] != suffix:
+                continue
+            if include and not _matches_any(include, rel_path, entry.name):
+                continue
+            if exclude and _matches_any(exclude, rel_path, entry.name):
+                continue
+            if rules and _ignored(rules, entry.path, False):
+                continue
+            yield Path(entry.path)
+        else:
+            stack.pop()
+
+
+def list_dir(dir_path):
+    """Return the names of a directory's files, cached until the directory changes."""
+    dir_path = os.fspath(dir_path)
+    mtime = os.stat(dir_path).st_mtime_ns
+    cached = _LISTINGS.get(dir_path)
+    if cached is None or cached[0] != mtime:
+        with os.scandir(dir_path) as scan:
+            names = [entry.name for entry in scan if entry.is_file()]
+        cached = _LISTINGS[dir_path] = (mtime, names)
+    return cached[1]
@@ -0,0 +1,17 @@
+"""This module exercises pruning analysis to the features of a diff"""
+from plinko.entity_matcher import EntityMatcher
+from plinko.parsers.diff_scope import DiffScope
+
+
+def test_positive_holds_diff_features():
+    scope = DiffScope(
+        {"hosts": ["create", {"interfaces": ["list"]}], "content_views": ["publish"]},
+        EntityMatcher(["Host", "ContentView"]),
+        "ExampleName",
+    )
+    assert scope.holds("Host create")
+    assert scope.holds("Host interface list")
+    assert scope.holds("Host interfaces")
+    assert not scope.holds("Host delete")
+    assert not scope.holds("ContentView create")
+    assert not scope.holds("Organization create")
@@ -0,0 +1,38 @@
+"""This module exercises the pytest_tools FixtureGraph"""
+from plinko.parsers.pytest_tools import PLUGINS, FixtureGraph
+from plinko.parsers.python_parser import FunctionSummary
+
+
+def fixture(name, covers=(), args=()):
+    return FunctionSummary(name, name, is_fixture=True, covers=covers, args=args)
+
+
+def test_positive_nearest_scope_wins(tmp_path):
+    graph = FixtureGraph()
+    graph.add(PLUGINS, fixture("module_org", ["Organization create"]))
+    graph.add(str(tmp_path / "api"), fixture("module_org", ["Organization update"]))
+    scope, found = graph.find("module_org", tmp_path / "api/test_org.py")
+    assert graph.coverage(scope, found.name) == {"Organization update"}
+    scope, found = graph.find("module_org", tmp_path / "cli/test_org.py")
+    assert graph.coverage(scope, found.name) == {"Organization create"}
+    assert graph.find("module_lce", tmp_path / "api/test_org.py") is None
+
+
+def test_positive_requested_fixtures_followed(tmp_path):
+    graph = FixtureGraph()
+    graph.add(PLUGINS, fixture("module_org", ["Organization create"]))
+    graph.add(PLUGINS, fixture("module_lce", ["LifecycleEnvironment create"], ["module_org"]))
+    # overrides a fixture of the same name further up, using it
+    graph.add(str(tmp_path), fixture("module_lce", ["ContentView create"], ["module_lce"]))
+    scope, found = graph.find("module_lce", tmp_path / "test_cv.py")
+    assert graph.coverage(scope, found.name) == {
+        "ContentView create",
+        "LifecycleEnvironment create",
+        "Organization create",
+    }
+    # a test module's own fixtures shadow everything else
+    graph.set_module_fixtures(tmp_path / "test_cv.py", [fixture("module_org")])
+    scope, found = graph.find("module_org", tmp_path / "test_cv.py")
+    assert graph.coverage(scope, found.name) == set()
+    scope, found = graph.find("module_lce", tmp_path / "test_cv.py")
+    assert "Organization create" in graph.coverage(scope, found.name)
@@ -15,3 +15,41 @@ def test_positive_import_first_party():
 def test_positive_import_third_party():
     assert ImportManager.get_file("click.command")
     assert ImportManager.get_ast("click.command")
+
+
+def test_positive_resolved_imports_keep_no_ast():
+    ImportManager.register("lazy_parser", "plinko.parsers", "python_parser")
+    ImportManager.resolve_all()
+    assert ImportManager.known_imports["lazy_parser"]["location"].name == "python_parser.py"
+    assert "ast" not in ImportManager.known_imports["lazy_parser"]
+    assert ImportManager.get_ast("lazy_parser")
+
+
+def test_positive_reverse_lookups():
+    ImportManager.register("lookup_alias", "lookup_mod", "lookup_func")
+    ImportManager.register("lookup_other", "lookup_mod", "lookup_func")
+    assert ImportManager._find_import("lookup_mod") == "lookup_alias"
+    assert ImportManager._find_import("lookup_func") == "lookup_alias"
+    assert ImportManager.find_target("lookup_mod.lookup_func") == "lookup_alias"
+    assert ImportManager._find_import("lookup_missing") is None
+
+
+def test_positive_reverse_lookups_replaced_entry():
+    ImportManager.register("replaced_first", "replaced_mod")
+    ImportManager.register("replaced_second", "replaced_mod")
+    ImportManager._set_entry(
+        "replaced_first", {"module_name": "replaced_mod", "location": "~bad~"}
+    )
+    assert ImportManager._find_import("replaced_mod") == "replaced_first"
+    assert ImportManager._by_module_name["replaced_mod"] == [
+        "replaced_first",
+        "replaced_second",
+    ]
+
+
+def test_positive_reverse_lookups_restored():
+    state = ImportManager.snapshot()
+    ImportManager.register("restored_alias", "restored_mod")
+    assert ImportManager._find_import("restored_mod") == "restored_alias"
+    ImportManager.restore(state)
+    assert ImportManager._find_import("restored_mod") is None
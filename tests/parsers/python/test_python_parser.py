@@ -1,5 +1,8 @@
+import ast
+
 from plinko import helpers
 from plinko import code_parser
+from plinko.parsers import python_importer, python_parser
 
 # def test_robottelo_api():
 #     CliRunner().invoke(entry_point, [
@@ -47,3 +50,94 @@ def test_robottelo_api():
             f"projects/{name}/api/{product_ver}/min-tests.yaml",
             "minimal tests",
         )
+
+
+def test_body_analyzer_interests():
+    line = "setting_object = entities.Setting().search(query={'search': f'name={request.param}'})[0]"
+    statement = ast.parse(line).body[0]
+    interests = python_parser.BodyAnalyzer().analyze(statement, ["Setting"])
+    assert interests == {
+        "method_calls": ["search", "Setting"],
+        "attributes_accessed": ["entities.Setting", "param"],
+        "module_accessed": ["entities", "request"],
+        "entity_instance": ["Setting"],
+        "instanced": ["Setting"],
+        "assignment": {"setting_object": "search"},
+    }
+    # the analyzer must leave the ast untouched
+    assert not any("_path" in node.__dict__ for node in ast.walk(statement))
+
+
+def test_module_summary_shared_between_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "summary_helpers").mkdir()
+    (tmp_path / "summary_helpers" / "__init__.py").write_text("")
+    (tmp_path / "summary_helpers" / "factory.py").write_text(
+        "from nailgun import entities\n\n\n"
+        "def make_org():\n    return entities.Organization().create()\n\n\n"
+        "def make_host():\n    return entities.Host().create()\n"
+    )
+    for name in ("test_org.py", "test_host.py"):
+        (tmp_path / name).write_text(
+            "from summary_helpers.factory import make_org, make_host as new_host\n"
+        )
+    parser = code_parser.CodeParser(
+        entity_methods={"organizations": ["create"], "hosts": ["create"]},
+        project_root=tmp_path,
+        use_cache=False,
+        dump_entities=False,
+    )
+    org_parser = python_parser.CodeParser(tmp_path / "test_org.py", parser)
+    org_parser._parse_file()
+    org_parser._parse_import("make_org")
+    org_parser.methods["make_org"].covers.add("Org update")
+    host_parser = python_parser.CodeParser(tmp_path / "test_host.py", parser)
+    host_parser._parse_file()
+    host_parser._parse_import("make_org")
+    host_parser._parse_import("new_host")
+    # the module was analyzed once, and importers can't change its summary
+    assert len(python_importer.ImportManager.module_summaries) == 1
+    assert host_parser.methods["make_org"].covers == {"Organization create"}
+    assert host_parser.methods["new_host"].covers == {"Host create"}
+    # summarized functions keep their results, but not their syntax tree or parser
+    summary = next(iter(python_importer.ImportManager.module_summaries.values()))
+    assert summary.functions["make_org"].ast is None
+    assert summary.functions["make_org"].parent_parser is None
+    assert summary.functions["make_org"].lineno == 4
+
+
+def test_function_summary_compact():
+    summary = python_parser.FunctionSummary("test_a.py:test_one", "test_one", covers=set())
+    assert summary.covers is summary.calls
+    assert not hasattr(summary, "__dict__")
+    assert python_parser.FunctionSummary.from_dict(summary.to_dict()).to_dict() == summary.to_dict()
+
+
+def test_investigations_worklist(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "test_chain.py").write_text(
+        "from nailgun import entities\n\n\n"
+        "def ping():\n    pong()\n    missing_helper()\n\n\n"
+        "def pong():\n    ping()\n    missing_helper()\n    entities.Host().create()\n\n\n"
+        "class TestChain:\n    def test_positive_chain(self):\n        ping()\n        missing_helper()\n"
+    )
+    parser = code_parser.CodeParser(
+        entity_methods={"hosts": ["create"]},
+        project_root=tmp_path,
+        use_cache=False,
+        dump_entities=False,
+    )
+    investigated = []
+    investigate_import = python_parser.CodeParser._investigate_import
+
+    def record_import(self, subject):
+        investigated.append(subject)
+        return investigate_import(self, subject)
+
+    monkeypatch.setattr(python_parser.CodeParser, "_investigate_import", record_import)
+    chain_parser = python_parser.CodeParser(tmp_path / "test_chain.py", parser)
+    chain_parser.parse()
+    # functions calling each other are parsed once, and each unknown name is looked up once
+    assert sorted(investigated) == ["Host", "missing_helper"]
+    assert not chain_parser._to_investigate
+    assert chain_parser.methods["test_chain.py:pong"].covers == {"Host create"}
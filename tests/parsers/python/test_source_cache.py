@@ -0,0 +1,32 @@
+"""This module exercises the shared SourceCache"""
+import os
+
+from plinko.parsers.source_cache import SourceCache
+
+
+def test_positive_parsed_once(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_text("def func():\r\n    pass\r\n")
+    tree = SourceCache.parse(module)
+    assert SourceCache.parse(str(module)) is tree
+    assert SourceCache.get(module).lines == ["def func():\n", "    pass\n"]
+
+
+def test_positive_changed_file_read_again(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_text("def func():\n    pass\n")
+    tree = SourceCache.parse(module)
+    module.write_text("def other_func():\n    pass\n")
+    os.utime(module, ns=(1, 1))  # a different mtime, however fast this runs
+    assert SourceCache.parse(module) is not tree
+    assert SourceCache.parse(module).body[0].name == "other_func"
+
+
+def test_positive_old_trees_dropped(tmp_path, monkeypatch):
+    monkeypatch.setattr(SourceCache, "max_trees", 2)
+    modules = [tmp_path / f"module_{num}.py" for num in range(3)]
+    for module in modules:
+        module.write_text("pass\n")
+        SourceCache.parse(module)
+    assert SourceCache.get(modules[0])._tree is None
+    assert SourceCache.get(modules[2])._tree is not None
@@ -1,3 +1,4 @@
+from plinko import walker
 from plinko.parsers.source_finder import SourcePath
 
 def test_find_module():
@@ -29,3 +30,30 @@ def test_find_nonexistent_submodule():
     source_path = SourcePath()
     path = source_path.find("source_finder.nonexistent_submodule")
     assert path is None
+
+def test_find_from_index_without_probing(tmp_path):
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "sub" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "sub" / "mod.py").write_text("")
+    source_path = SourcePath(tmp_path)
+    assert source_path.modules["pkg.sub"] == tmp_path / "pkg" / "sub" / "__init__.py"
+    assert source_path.stems["mod"] == [tmp_path / "pkg" / "sub" / "mod.py"]
+    # lookups are answered from the index, not the file system
+    (tmp_path / "pkg" / "sub" / "mod.py").unlink()
+    assert source_path.find("pkg.sub.mod").name == "mod.py"
+    assert source_path.find(".sub.mod", rel_path=tmp_path / "pkg" / "sub" / "__init__.py").name == "mod.py"
+
+def test_finder_is_indexed_once(tmp_path):
+    (tmp_path / "mod.py").write_text("")
+    source_path = SourcePath(tmp_path)
+    (tmp_path / "new.py").write_text("")
+    assert SourcePath(tmp_path) is source_path
+    assert "new" not in source_path.modules
+
+def test_finder_indexes_excluded_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(walker, "settings", {"exclude_files": ["venv"]})
+    (tmp_path / "venv" / "vendored").mkdir(parents=True)
+    (tmp_path / "venv" / "vendored" / "__init__.py").write_text("")
+    source_path = SourcePath(tmp_path)
+    assert source_path.modules["venv.vendored"] == tmp_path / "venv" / "vendored" / "__init__.py"
@@ -0,0 +1,78 @@
+"""A small generated project, shared by the tests that parse one"""
+from plinko import code_parser
+from plinko.parsers.pytest_tools import FixtureHandler
+
+PROJECT_FILES = {
+    "conftest.py": """
+import pytest
+from nailgun import entities
+
+
+@pytest.fixture
+def module_org():
+    return entities.Organization().create()
+""",
+    "tests/test_host.py": """
+from nailgun import entities
+
+
+def test_positive_create(module_org):
+    host = entities.Host(organization=module_org).create()
+    host.update(["name"])
+
+
+def test_positive_nothing():
+    assert True
+""",
+    "tests/test_contentview.py": """
+from nailgun import entities
+
+
+class TestContentView:
+    def test_positive_publish(self):
+        cv = entities.ContentView().create()
+        cv.publish()
+""",
+}
+# a conftest for tests/, overriding module_org
+CONTENTVIEW_CONFTEST = """
+import pytest
+from nailgun import entities
+
+
+@pytest.fixture
+def module_org():
+    return entities.ContentView().create()
+"""
+ENTITY_METHODS = {
+    "hosts": ["create", "update"],
+    "content_views": ["create", "publish"],
+    "organizations": ["create"],
+}
+
+
+def make_project(tmp_path):
+    for name, contents in PROJECT_FILES.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(contents)
+    return tmp_path
+
+
+def parse_project(project_root, since=None, changed=(), **kwargs):
+    FixtureHandler.reset()
+    parser = code_parser.CodeParser(
+        **{
+            "entity_methods": ENTITY_METHODS,
+            "project_root": project_root,
+            "search_aggressiveness": "high",
+            "use_cache": False,
+            "use_index": False,
+            "dump_entities": False,
+            **kwargs,
+        }
+    )
+    if since or changed:
+        parser.parse_changes(project_root / "tests", base_ref=since, changed_paths=changed)
+    else:
+        parser.parse_directory(project_root / "tests")
+    return parser
@@ -0,0 +1,109 @@
+"""This module exercises the persistent ParseCache"""
+import os
+import time
+
+import pytest
+
+from plinko import cache as cache_module
+from plinko import helpers
+from plinko.cache import DiffCache, ParseCache, evict
+
+
+def test_positive_cache_roundtrip(tmp_path):
+    code_file = tmp_path / "test_file.py"
+    code_file.write_text("def test_one():\n    pass\n")
+    cache = ParseCache({"max_depth": 5}, cache_dir=tmp_path / "cache")
+    assert cache.get(code_file) is None
+    cache.put(code_file, [{"name": "test_one"}])
+    assert cache.get(code_file) == [{"name": "test_one"}]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_negative_cache_changed_file(tmp_path):
+    code_file = tmp_path / "test_file.py"
+    code_file.write_text("def test_one():\n    pass\n")
+    ParseCache({}, cache_dir=tmp_path / "cache").put(code_file, ["data"])
+    code_file.write_text("def test_two():\n    pass\n")
+    assert ParseCache({}, cache_dir=tmp_path / "cache").get(code_file) is None
+
+
+def test_negative_cache_changed_dependency(tmp_path):
+    code_file, helper = tmp_path / "test_file.py", tmp_path / "helper.py"
+    code_file.write_text("from helper import make\n")
+    helper.write_text("def make():\n    pass\n")
+    ParseCache({}, cache_dir=tmp_path / "cache").put(code_file, ["data"], [helper])
+    assert ParseCache({}, cache_dir=tmp_path / "cache").get(code_file) == ["data"]
+    helper.write_text("def make():\n    return 1\n")
+    assert ParseCache({}, cache_dir=tmp_path / "cache").get(code_file) is None
+
+
+def test_negative_cache_changed_settings(tmp_path):
+    code_file = tmp_path / "test_file.py"
+    code_file.write_text("def test_one():\n    pass\n")
+    ParseCache({"max_depth": 5}, cache_dir=tmp_path / "cache").put(code_file, ["data"])
+    assert ParseCache({"max_depth": 6}, cache_dir=tmp_path / "cache").get(code_file) is None
+
+
+def test_negative_cache_older_results(tmp_path, monkeypatch):
+    code_file = tmp_path / "test_file.py"
+    code_file.write_text("def test_one():\n    pass\n")
+    ParseCache({}, cache_dir=tmp_path / "cache").put(code_file, ["data"])
+    monkeypatch.setattr(cache_module, "RESULTS_VERSION", cache_module.RESULTS_VERSION + 1)
+    assert ParseCache({}, cache_dir=tmp_path / "cache").get(code_file) is None
+
+
+def test_positive_diff_cache(tmp_path):
+    diff_file = tmp_path / "6.16.0-comp.yaml"
+    diff_file.write_text("hosts:\n- create\n- update\n")
+    loads = []
+
+    def loader(path):
+        loads.append(path)
+        return helpers.import_yaml(path)
+
+    cache = DiffCache(cache_dir=tmp_path / "cache")
+    assert cache.load(diff_file, loader) == {"hosts": ["create", "update"]}
+    assert cache.load(diff_file, loader) == {"hosts": ["create", "update"]}
+    assert len(loads) == 1
+    # contents JSON would change, like int keys, are always loaded from the YAML
+    diff_file.write_text("1:\n- create\n")
+    assert cache.load(diff_file, loader) == cache.load(diff_file, loader) == {1: ["create"]}
+    assert len(loads) == 3
+
+
+def test_positive_evict(tmp_path):
+    cache_dir = tmp_path / "cache"
+    code_files = [tmp_path / f"test_{num}.py" for num in range(3)]
+    cache = ParseCache({}, cache_dir=cache_dir)
+    for num, code_file in enumerate(code_files):
+        code_file.write_text(f"def test_{num}():\n    pass\n")
+        cache.put(code_file, ["data" * 100])
+    entries = sorted(cache_dir.rglob("*.json"), key=lambda path: path.read_text())
+    now = time.time()
+    for num, entry_path in enumerate(entries):
+        os.utime(entry_path, (now, now - num * 86400))
+    # reusing an entry makes it the most recently used
+    assert ParseCache({}, cache_dir=cache_dir).get(code_files[2]) == ["data" * 100]
+    evict(cache_dir, max_age=1.5, max_size=1)
+    assert len(list(cache_dir.rglob("*.json"))) == 3
+    # entries unused for too long go first, then the least recently used
+    evict(cache_dir, max_age=0.5, max_size=1)
+    assert ParseCache({}, cache_dir=cache_dir).get(code_files[1]) is None
+    evict(cache_dir, max_age=30, max_size=entries[0].stat().st_size / 2**20)
+    remaining = ParseCache({}, cache_dir=cache_dir)
+    assert [remaining.get(code_file) is not None for code_file in code_files] == [
+        False,
+        False,
+        True,
+    ]
+
+
+def test_negative_atomic_write_failure(tmp_path):
+    entry_path = tmp_path / "cache/entry.json"
+    entry_path.parent.mkdir()
+    entry_path.write_text("[]")
+    with pytest.raises(TypeError):
+        cache_module._atomic_write(entry_path, None)
+    # the old entry is untouched and nothing is left behind
+    assert list(entry_path.parent.iterdir()) == [entry_path]
+    assert entry_path.read_text() == "[]"
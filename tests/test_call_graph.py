@@ -0,0 +1,42 @@
+"""This module exercises the CallGraph coverage closure"""
+from types import SimpleNamespace
+
+from plinko.call_graph import CallGraph
+
+
+def method(covers=(), calls=()):
+    return SimpleNamespace(covers=set(covers), calls=set(calls))
+
+
+def test_positive_transitive_coverage():
+    methods = {
+        "test_one": method(["Host create"], ["make_org", "unknown"]),
+        "make_org": method(["Organization create"], ["gen_name"]),
+        "gen_name": method(),
+        "unknown": "stdlib",
+    }
+    graph = CallGraph(methods)
+    assert graph.coverage("test_one") == {"Host create", "Organization create"}
+    assert graph.coverage("unknown") is None
+    assert graph.coverage("missing") is None
+
+
+def test_positive_cycle_shares_coverage():
+    methods = {
+        "recursive_a": method(["Host create"], ["recursive_b"]),
+        "recursive_b": method(["Host update"], ["recursive_a", "helper"]),
+        "helper": method(["Host delete"]),
+    }
+    graph = CallGraph(methods)
+    expected = {"Host create", "Host update", "Host delete"}
+    assert graph.coverage("recursive_a") == graph.coverage("recursive_b") == expected
+
+
+def test_positive_deep_chain():
+    depth = 20000
+    methods = {f"helper_{num}": method([], [f"helper_{num + 1}"]) for num in range(depth)}
+    methods[f"helper_{depth}"] = method(["Host create"], ["helper_0"])
+    methods["helper_100"].covers.add("Host update")
+    graph = CallGraph(methods)
+    assert graph.coverage("helper_0") == {"Host create", "Host update"}
+    assert graph.coverage(f"helper_{depth}") == {"Host create", "Host update"}
@@ -0,0 +1,345 @@
+"""This module exercises the main CodeParser against a small generated project"""
+import subprocess
+
+import pytest
+from sample_project import (
+    CONTENTVIEW_CONFTEST,
+    ENTITY_METHODS,
+    PROJECT_FILES,
+    make_project,
+    parse_project,
+)
+
+from plinko import cache, code_parser
+
+HELPER_FILES = {
+    "robottelo/__init__.py": "",
+    "robottelo/utils.py": "import os\n\n\ndef gen_string():\n    return os.urandom(4).hex()\n",
+    "robottelo/factory.py": "from nailgun import entities\n\n"
+    "from robottelo.utils import gen_string\n\n\n"
+    "def make_host():\n    return entities.Host(name=gen_string()).create()\n",
+    # a helper named after an entity, like robottelo's Capsule
+    "robottelo/hosts.py": "from nailgun import entities\n\n\n"
+    "def Host():\n    return entities.Organization().create()\n",
+}
+# a test calling the helper named after an entity
+HOST_HELPER_TEST = "from robottelo.hosts import Host\n\n\ndef test_positive_helper():\n    Host()\n"
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """Record the name of every file the parser analyzes, rather than takes from a cache."""
+    analyzed = []
+    analyze_file = code_parser.CodeParser._analyze_file
+
+    def record_analyze(self, file_path):
+        analyzed.append(file_path.name)
+        return analyze_file(self, file_path)
+
+    monkeypatch.setattr(code_parser.CodeParser, "_analyze_file", record_analyze)
+    return analyzed
+
+
+def add_helpers(project_root):
+    for name, contents in HELPER_FILES.items():
+        (project_root / name).parent.mkdir(parents=True, exist_ok=True)
+        (project_root / name).write_text(contents)
+
+
+def test_positive_parse_directory(tmp_path):
+    parser = parse_project(make_project(tmp_path))
+    assert parser.cov_tests["test_host.py:test_positive_create"] == {
+        "Host create",
+        "Host update",
+        "Organization create",
+    }
+    assert parser.cov_tests["test_contentview.py:TestContentView:test_positive_publish"] == {
+        "ContentView create",
+        "ContentView publish",
+    }
+    assert parser.miss_tests == ["test_host.py:test_positive_nothing"]
+
+
+def test_positive_conftest_scopes(tmp_path):
+    project_root = make_project(tmp_path)
+    # overrides module_org for the tests in its directory only, building on the original
+    (project_root / "tests/api").mkdir()
+    (project_root / "tests/api/conftest.py").write_text(
+        "import pytest\nfrom nailgun import entities\n\n\n@pytest.fixture\n"
+        "def module_org(module_org):\n    return entities.Host(organization=module_org).create()\n"
+    )
+    (project_root / "tests/api/test_org.py").write_text("def test_positive_org(module_org):\n    pass\n")
+    parser = parse_project(project_root)
+    assert parser.cov_tests["test_org.py:test_positive_org"] == {
+        "Host create",
+        "Organization create",
+    }
+    assert "Host update" in parser.cov_tests["test_host.py:test_positive_create"]
+    assert parser.file_dependencies[str((project_root / "tests/test_host.py").absolute())] == [
+        str((project_root / "conftest.py").absolute())
+    ]
+
+
+def test_positive_parallel_matches_serial(tmp_path):
+    project_root = make_project(tmp_path)
+    serial = parse_project(project_root)
+    parallel = parse_project(project_root, jobs=2)
+    assert list(parallel.cov_tests.items()) == list(serial.cov_tests.items())
+    assert parallel.miss_tests == serial.miss_tests
+
+
+def test_positive_project_entities(tmp_path):
+    parser = parse_project(make_project(tmp_path))
+    cov_tests, miss_tests = parser.project({"hosts": ["create", "update"]})
+    assert cov_tests == {"test_host.py:test_positive_create": {"Host create", "Host update"}}
+    assert sorted(miss_tests) == [
+        "test_contentview.py:TestContentView:test_positive_publish",
+        "test_host.py:test_positive_nothing",
+    ]
+    assert parser.project(ENTITY_METHODS) == (parser.cov_tests, parser.miss_tests)
+
+
+def test_positive_project_reassigned_variable(tmp_path):
+    project_root = make_project(tmp_path)
+    (project_root / "tests/test_reassign.py").write_text(
+        "from nailgun import entities\n\n\n"
+        "def test_positive_reassign():\n"
+        "    item = entities.Host().create()\n"
+        "    item = entities.HostGroup().create()\n"
+        "    item.update(['name'])\n"
+    )
+    hosts = {"hosts": ["create", "update"]}
+    alone = parse_project(project_root, entity_methods=hosts)
+    both = parse_project(
+        project_root, entity_methods={**hosts, "host_groups": ["create", "update"]}
+    )
+    name = "test_reassign.py:test_positive_reassign"
+    assert both.cov_tests[name] == {"Host create", "HostGroup create", "HostGroup update"}
+    # the variable holds a host group either way, whether or not host groups are known
+    assert alone.cov_tests[name] == {"Host create"}
+    assert both.project(hosts)[0][name] == alone.cov_tests[name]
+
+
+def test_positive_project_entity_named_helper(tmp_path, monkeypatch):
+    project_root = make_project(tmp_path)
+    add_helpers(project_root)
+    (project_root / "tests/test_helper.py").write_text(HOST_HELPER_TEST)
+    monkeypatch.chdir(project_root)
+    orgs = {"organizations": ["create"]}
+    code_parser.reset_parse_state()
+    alone = parse_project(project_root, entity_methods=orgs)
+    code_parser.reset_parse_state()
+    both = parse_project(project_root, entity_methods={"hosts": ["create"], **orgs})
+    name = "test_helper.py:test_positive_helper"
+    # the helper is followed whether or not hosts are known
+    assert alone.cov_tests[name] == {"Organization create"}
+    assert both.cov_tests[name] == {"Host create", "Organization create"}
+    assert both.project(orgs)[0][name] == alone.cov_tests[name]
+
+
+def test_positive_parse_cache_ignores_methods(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    project_root = make_project(tmp_path / "project")
+    parse_project(project_root, use_cache=True)
+    # the same entities with other methods parse to the same results
+    methods = {"hosts": ["delete"], "content_views": ["publish"], "organizations": ["create"]}
+    parser = parse_project(project_root, entity_methods=methods, use_cache=True)
+    assert parser.cache.misses == 0
+    assert parser.cov_tests == parse_project(project_root, entity_methods=methods).cov_tests
+    # unless pruning, which only analyzes the code those methods could reach
+    parse_project(project_root, use_cache=True, prune=True)
+    pruned = parse_project(project_root, entity_methods=methods, use_cache=True, prune=True)
+    assert pruned.cache.hits == 0
+
+
+def test_positive_code_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    project_root = make_project(tmp_path / "project")
+    hosts = {"hosts": ["create", "update"]}
+    first = parse_project(project_root, entity_methods=hosts, use_index=True)
+    # organizations appear in the code, so the index must be extended to include them
+    both = parse_project(project_root, use_index=True)
+    assert both.cov_tests == parse_project(project_root).cov_tests
+    # every entity is indexed now, so the stored results are used without parsing
+    monkeypatch.setattr(code_parser.CodeParser, "_parse_tree", None)
+    again = parse_project(project_root, entity_methods=hosts, use_index=True)
+    assert (again.cov_tests, again.miss_tests) == (first.cov_tests, first.miss_tests)
+    # and entities that don't appear in the code can't change anything
+    unused = parse_project(
+        project_root, entity_methods={**hosts, "subscriptions": ["create"]}, use_index=True
+    )
+    assert unused.cov_tests == first.cov_tests
+
+
+def test_positive_code_index_drops_absent_entities(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    project_root = make_project(tmp_path / "project")
+    parse_project(
+        project_root,
+        entity_methods={"hosts": ["create"], "subscriptions": ["create"]},
+        use_index=True,
+    )
+    # extending the index doesn't carry over entities the code never mentions
+    parser = parse_project(project_root, use_index=True)
+    entry = parser.index.load(project_root / "tests")
+    assert sorted(entry["entity_methods"]) == sorted(ENTITY_METHODS)
+    assert parser.cov_tests == parse_project(project_root).cov_tests
+
+
+def test_positive_code_index_entity_named_helper(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    project_root = make_project(tmp_path / "project")
+    add_helpers(project_root)
+    (project_root / "tests/test_helper.py").write_text(HOST_HELPER_TEST)
+    monkeypatch.chdir(project_root)
+    orgs = {"organizations": ["create"]}
+    code_parser.reset_parse_state()
+    fresh = parse_project(project_root, entity_methods=orgs)
+    code_parser.reset_parse_state()
+    parse_project(project_root, use_index=True)
+    # organizations are indexed, so the stored results are projected onto them
+    monkeypatch.setattr(code_parser.CodeParser, "_parse_tree", None)
+    indexed = parse_project(project_root, entity_methods=orgs, use_index=True)
+    assert indexed.cov_tests["test_helper.py:test_positive_helper"] == {"Organization create"}
+    assert (indexed.cov_tests, indexed.miss_tests) == (fresh.cov_tests, fresh.miss_tests)
+
+
+def git(project_root, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=plinko", "-c", "user.email=plinko@example.com", *args],
+        cwd=project_root,
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_positive_parse_changes(tmp_path, monkeypatch, analyzed):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    project_root = make_project(tmp_path / "project")
+    git(project_root, "init", "-q")
+    git(project_root, "add", ".")
+    git(project_root, "commit", "-q", "-m", "base")
+    parse_project(project_root, use_index=True)
+    # a changed test and a new one are parsed, the unchanged test keeps its stored results
+    (project_root / "tests/test_contentview.py").write_text(
+        PROJECT_FILES["tests/test_contentview.py"] + "\n    def test_positive_nothing(self):\n"
+        "        assert True\n"
+    )
+    (project_root / "tests/test_org.py").write_text(
+        "from nailgun import entities\n\n\ndef test_positive_org():\n"
+        "    entities.Organization().create()\n"
+    )
+    analyzed.clear()
+    changes = parse_project(project_root, use_index=True, since="HEAD")
+    assert sorted(analyzed) == ["test_contentview.py", "test_org.py"]
+    full = parse_project(project_root)
+    assert changes.cov_tests == full.cov_tests
+    assert sorted(changes.miss_tests) == sorted(full.miss_tests)
+    # the conftest is used by every test, so changing it affects them all
+    git(project_root, "add", ".")
+    git(project_root, "commit", "-q", "-m", "more tests")
+    analyzed.clear()
+    parse_project(project_root, use_index=True, changed=[project_root / "conftest.py"])
+    assert sorted(analyzed) == ["test_contentview.py", "test_host.py", "test_org.py"]
+
+
+def test_positive_parse_changes_new_files(tmp_path, monkeypatch, analyzed):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    project_root = make_project(tmp_path / "project")
+    git(project_root, "init", "-q")
+    git(project_root, "add", ".")
+    git(project_root, "commit", "-q", "-m", "base")
+    parse_project(project_root, use_index=True)
+    # a new conftest overrides a fixture for the tests beneath it
+    (project_root / "tests/conftest.py").write_text(CONTENTVIEW_CONFTEST)
+    changes = parse_project(project_root, use_index=True, since="HEAD", use_cache=True)
+    assert changes.cov_tests["test_host.py:test_positive_create"] == {
+        "ContentView create",
+        "Host create",
+        "Host update",
+    }
+    assert changes.cov_tests == parse_project(project_root).cov_tests
+    # a test importing a module that doesn't exist yet
+    (project_root / "tests/test_helper.py").write_text(HOST_HELPER_TEST)
+    git(project_root, "add", ".")
+    git(project_root, "commit", "-q", "-m", "conftest")
+    monkeypatch.chdir(project_root)
+    code_parser.reset_parse_state()
+    parse_project(project_root, use_index=True, use_cache=True)
+    analyzed.clear()
+    # a new module no import was looking for changes nothing
+    (project_root / "tests/helpers.py").write_text("def helper():\n    pass\n")
+    parse_project(project_root, use_index=True, since="HEAD", use_cache=True)
+    assert analyzed == []
+    # one that may be what an import points to re-parses the tests that couldn't find it
+    add_helpers(project_root)
+    code_parser.reset_parse_state()
+    changes = parse_project(project_root, use_index=True, since="HEAD", use_cache=True)
+    assert analyzed == ["test_helper.py"]
+    assert changes.cov_tests["test_helper.py:test_positive_helper"] == {
+        "Host create",
+        "Organization create",
+    }
+    code_parser.reset_parse_state()
+    assert changes.cov_tests == parse_project(project_root).cov_tests
+
+
+def test_positive_stream_matches_memory(tmp_path):
+    project_root = make_project(tmp_path / "project")
+    in_memory = parse_project(project_root)
+    hosts = {"hosts": ["create", "update"]}
+    for jobs in (1, 2):
+        streamed = parse_project(project_root, stream=tmp_path / "results.jsonl", jobs=jobs)
+        assert streamed.all_methods == {}
+        for entity_methods in (ENTITY_METHODS, hosts):
+            cov_tests, miss_tests = {}, []
+            for file_cov, file_miss in streamed.project_stream(entity_methods):
+                cov_tests.update(file_cov)
+                miss_tests.extend(file_miss)
+            expected = in_memory.project(entity_methods)
+            assert list(cov_tests.items()) == list(expected[0].items())
+            assert miss_tests == expected[1]
+
+
+def test_positive_prefilter_skips_files_without_tests(tmp_path, analyzed):
+    project_root = make_project(tmp_path)
+    (project_root / "tests/constants.py").write_text("HOSTS = ['test_host']\n")
+    (project_root / "tests/test_data.py").write_text("def make_host():\n    pass\n")
+    parser = parse_project(project_root)
+    assert parser.skipped == 2
+    assert sorted(analyzed) == ["test_contentview.py", "test_host.py"]
+    assert parser.all_methods[str(project_root / "tests/constants.py")] == {}
+    assert parser.miss_tests == ["test_host.py:test_positive_nothing"]
+
+
+def test_positive_pruned_parse(tmp_path, monkeypatch):
+    project_root = make_project(tmp_path)
+    add_helpers(project_root)
+    (project_root / "tests/test_factory.py").write_text(
+        "from robottelo.factory import make_host\nfrom robottelo.utils import gen_string\n\n\n"
+        "def test_positive_factory():\n    make_host()\n\n\n"
+        "def test_positive_utils():\n    gen_string()\n"
+    )
+    monkeypatch.chdir(project_root)
+    code_parser.reset_parse_state()
+    parser = parse_project(
+        project_root,
+        entity_methods={"hosts": ["create"], "content_views": ["publish"]},
+        prune=True,
+        max_depth=2,
+    )
+    scope = parser.diff_scope
+    utils, factory = (str(project_root / f"robottelo/{name}.py") for name in ("utils", "factory"))
+    assert scope.reach(utils, 1) == (False, [utils])
+    assert scope.reach(factory, 1)[0]
+    # only the diff's features are reported
+    assert parser.cov_tests == {
+        "test_factory.py:test_positive_factory": {"Host create"},
+        "test_host.py:test_positive_create": {"Host create"},
+        "test_contentview.py:TestContentView:test_positive_publish": {"ContentView publish"},
+    }
+    assert "test_factory.py:test_positive_utils" in parser.miss_tests
+    # results that skipped a module are still redone when it changes
+    test_file = str((project_root / "tests/test_factory.py").absolute())
+    assert utils in parser.file_dependencies[test_file]
+    code_parser.reset_parse_state()
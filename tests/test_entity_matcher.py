@@ -0,0 +1,33 @@
+"""This module exercises the EntityMatcher"""
+from plinko.entity_matcher import EntityMatcher
+
+ENTITIES = ["Host", "HostCollection", "ContentView", "Organization"]
+
+
+def test_positive_low_exact_match():
+    matcher = EntityMatcher(ENTITIES, "low")
+    assert matcher.find("entities.HostCollection(organization=org).create()") == [
+        "Host",
+        "HostCollection",
+    ]
+    assert matcher.find("content_view = make_contentview()") == []
+
+
+def test_positive_med_variant_match():
+    matcher = EntityMatcher(ENTITIES, "med")
+    assert matcher.find("org = make_organization()") == ["Organization"]
+    assert matcher.find("CONTENTVIEWS = []") == ["ContentView"]
+    assert matcher.find("Contentview.create()") == []
+
+
+def test_positive_high_case_insensitive_match():
+    matcher = EntityMatcher(ENTITIES, "high")
+    assert matcher.find("Contentview.create(); HOSTcollection.list()") == [
+        "Host",
+        "HostCollection",
+        "ContentView",
+    ]
+
+
+def test_negative_no_entities():
+    assert EntityMatcher([], "high").find("entities.Host().create()") == []
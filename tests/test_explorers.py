@@ -0,0 +1,72 @@
+"""This module exercises matching diffs against pytest collection exports"""
+from plinko import explorers, helpers
+
+TREE_EXPORT = """============================= test session starts ==============================
+rootdir: /home/user/robottelo, configfile: pyproject.toml
+collected 5 items
+
+<Dir robottelo>
+  <Dir tests>
+    <Dir api>
+      <Module test_contentview.py>
+        <Class TestContentView>
+          <Function test_positive_create[rhel7]>
+          <Function test_positive_create[rhel8]>
+          <Function test_positive_publish>
+        <Function test_negative_create>
+      <Module test_host.py>
+        <Function test_positive_create_and_update>
+
+========================== 5 tests collected in 0.01s ==========================
+"""
+NODE_ID_EXPORT = """tests/api/test_contentview.py::TestContentView::test_positive_create[rhel7]
+tests/api/test_contentview.py::TestContentView::test_positive_publish
+tests/api/test_contentview.py::test_negative_create
+tests/api/test_host.py::test_positive_create_and_update
+
+4 tests collected in 0.01s
+"""
+PT_DICT = {
+    "tests/api/test_contentview.py": {
+        "TestContentView": ["test_positive_create", "test_positive_publish"],
+        None: ["test_negative_create"],
+    },
+    "tests/api/test_host.py": ["test_positive_create_and_update"],
+}
+
+
+def test_positive_read_exports(tmp_path):
+    for export in (TREE_EXPORT, NODE_ID_EXPORT):
+        (tmp_path / "collect.txt").write_text(export)
+        assert explorers.pyt_collect_to_dict(tmp_path / "collect.txt") == PT_DICT
+
+
+def test_positive_find_test_match():
+    collection = explorers.CollectionIndex(PT_DICT)
+    assert explorers.find_test_match("content_views", "create", collection) == {
+        "tests/api/test_contentview.py": {
+            "TestContentView": ["test_positive_create"],
+            None: ["test_negative_create"],
+        }
+    }
+    assert explorers.find_test_match("hosts", "update --name", collection, "cli") == {
+        "tests/api/test_host.py": ["test_positive_create_and_update"]
+    }
+    assert explorers.find_test_match("hosts", "destroy", collection) == {}
+
+
+def test_positive_plink_apix(tmp_path):
+    diff_path = tmp_path / "6.15.0-to-6.16.0-comp-diff.yaml"
+    diff_path.write_text("satellite:\n  content_views:\n  - publish\n  - destroy\n")
+    (tmp_path / "collect.txt").write_text(NODE_ID_EXPORT)
+    results = explorers.plink_apix(str(diff_path), tmp_path / "collect.txt")
+    assert results["missing"] == ["content_views destroy"]
+    assert results["found"] == [
+        [
+            "content_views publish",
+            {"tests/api/test_contentview.py": {"TestContentView": ["test_positive_publish"]}},
+        ]
+    ]
+    assert helpers.plinko_to_ptcommand(results["found"]) == (
+        "pytest -v tests/api/test_contentview.py::TestContentView::test_positive_publish"
+    )
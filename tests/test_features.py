@@ -0,0 +1,24 @@
+"""This module exercises the FeatureTable that numbers coverage features"""
+from plinko.features import FeatureTable
+
+
+def test_positive_mask_round_trip():
+    features = {"Host create", "Host update", "ContentView publish"}
+    mask = FeatureTable.mask(features)
+    assert FeatureTable.features(mask) == features
+    assert FeatureTable.mask(["Host create"]) | mask == mask
+    assert FeatureTable.features(0) == set()
+
+
+def test_positive_shared_strings():
+    feature = FeatureTable.intern("".join(["Host ", "delete"]))
+    assert FeatureTable.intern("".join(["Host ", "delete"])) is feature
+    assert FeatureTable.entity(feature) == "Host"
+
+
+def test_positive_reset():
+    FeatureTable.mask(["Host create", "Host delete"])
+    FeatureTable.reset()
+    mask = FeatureTable.mask(["Host delete"])
+    assert mask == 1
+    assert FeatureTable.features(mask) == {"Host delete"}
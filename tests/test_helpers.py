@@ -0,0 +1,27 @@
+"""This module exercises the miscellaneous helpers"""
+import itertools
+
+from plinko import helpers
+
+
+def test_positive_flatten_nested():
+    diff = {
+        "hosts": ["create", {"subscription": ["attach", "remove"]}, {"puppet": {"class": []}}],
+        "organizations": "create",
+    }
+    assert helpers.flatten_mixed([diff]) == [
+        "hosts create",
+        "hosts subscription attach",
+        "hosts subscription remove",
+        "organizations create",
+    ]
+
+
+def test_positive_flatten_lazily():
+    # deeper than the recursion limit, and only as much is walked as is asked for
+    deep = "leaf"
+    for num in range(5000):
+        deep = {f"k{num}": [deep, "other"]}
+    first, second = itertools.islice(helpers.iter_flattened(deep), 2)
+    assert first.startswith("k4999 k4998") and first.endswith("k0 leaf")
+    assert second.endswith("k0 other")
@@ -0,0 +1,46 @@
+"""This module exercises the reports written from streamed results"""
+import json
+
+import yaml
+
+from plinko import helpers, results
+from plinko.parsers.python_parser import FunctionSummary
+
+
+def test_positive_stream_records(tmp_path):
+    stream = results.ResultStream(tmp_path / "results.jsonl")
+    summaries = [
+        FunctionSummary("test_host.py:test_create", "test_create", is_test=True, covers=["B", "A"]),
+        FunctionSummary("test_host.py:helper", "helper", covers=["A"]),
+        FunctionSummary("test_host.py:test_nothing", "test_nothing", is_test=True),
+    ]
+    stream.write("tests/test_host.py", summaries)
+    assert list(stream.records()) == [
+        {
+            "file": "tests/test_host.py",
+            "tests": {"test_host.py:test_create": ["A", "B"], "test_host.py:test_nothing": []},
+        }
+    ]
+    # writing reopens the stream after reading it back
+    stream.write("tests/test_org.py", [])
+    assert len(list(stream.records())) == 2
+
+
+def test_positive_min_tests_match(tmp_path):
+    per_file = [
+        ({"a.py:test_one": {"A"}, "a.py:test_both": {"A", "B"}}, ["a.py:test_none"]),
+        ({"b.py:test_both": {"A", "B"}, "b.py:test_c": {"C"}, "b.py:test_ac": {"A", "C"}}, []),
+    ]
+    results.write_reports(iter(per_file), tmp_path, minimal=True)
+    lines = (tmp_path / "test-coverage.jsonl").read_text().splitlines()
+    assert json.loads(lines[1]) == {"test": "a.py:test_both", "covers": ["A", "B"]}
+    assert len(lines) == 5
+    assert (tmp_path / "test-no-coverage.jsonl").read_text() == '{"test": "a.py:test_none"}\n'
+    # the same tests are chosen as from every test's coverage at once
+    cov_tests = {test: covers for file_cov, _ in per_file for test, covers in file_cov.items()}
+    min_tests = yaml.safe_load((tmp_path / "min-tests.yaml").read_text())
+    assert {
+        f"{file_name}:{test}": set(covers)
+        for file_name, tests in min_tests.items()
+        for test, covers in tests.items()
+    } == helpers.get_min_tests(cov_tests)
@@ -0,0 +1,124 @@
+"""This module exercises the analysis server against a small generated project"""
+import threading
+
+import pytest
+from sample_project import CONTENTVIEW_CONFTEST, ENTITY_METHODS, make_project
+
+from plinko import server
+
+HOSTS = {"hosts": ["create", "update"]}
+
+
+def make_state(tmp_path):
+    project_root = make_project(tmp_path)
+    state = server.AnalysisState(
+        project_root / "tests",
+        project_root=project_root,
+        search_aggressiveness="high",
+        use_cache=False,
+        use_index=False,
+    )
+    return project_root, state
+
+
+def test_positive_query_entities(tmp_path):
+    _, state = make_state(tmp_path)
+    results = state.query(entity_methods=HOSTS)
+    assert results["cov_tests"] == {
+        "test_host.py:test_positive_create": ["Host create", "Host update"]
+    }
+    # entities not parsed for yet are added to the results
+    results = state.query(entity_methods=ENTITY_METHODS, behavior="minimal")
+    assert results["cov_tests"]["test_host.py:test_positive_create"] == [
+        "Host create",
+        "Host update",
+        "Organization create",
+    ]
+    assert set(results["min_tests"]) == set(results["cov_tests"])
+    results = state.query(features=["ContentView publish"])
+    assert results["cov_tests"] == {
+        "test_contentview.py:TestContentView:test_positive_publish": ["ContentView publish"]
+    }
+    assert sorted(results["miss_tests"]) == [
+        "test_host.py:test_positive_create",
+        "test_host.py:test_positive_nothing",
+    ]
+
+
+def test_negative_query_unknown_features(tmp_path):
+    _, state = make_state(tmp_path)
+    with pytest.raises(ValueError, match="Host create"):
+        state.query(features=["Host create"])
+    state.query(entity_methods=HOSTS)
+    with pytest.raises(ValueError, match="ContentView publish"):
+        state.query(features=["Host create", "ContentView publish"])
+    assert state.query(features=["Host update"])["cov_tests"] == {
+        "test_host.py:test_positive_create": ["Host update"]
+    }
+    # tests covering the entity, but not the feature, are missed rather than dropped
+    results = state.query(features=["Host delete"])
+    assert results["cov_tests"] == {}
+    assert sorted(results["miss_tests"]) == [
+        "test_contentview.py:TestContentView:test_positive_publish",
+        "test_host.py:test_positive_create",
+        "test_host.py:test_positive_nothing",
+    ]
+
+
+def test_negative_query_bad_diff(tmp_path):
+    _, state = make_state(tmp_path)
+    diff_file = tmp_path / "hosts.yaml"
+    diff_file.write_text("hosts:\n- create\n")
+    with pytest.raises(ValueError, match="compact diff"):
+        state.query(diff=str(diff_file))
+    assert state.parser is None
+
+
+def test_positive_query_sees_changes(tmp_path):
+    project_root, state = make_state(tmp_path)
+    state.query(entity_methods=HOSTS)
+    test_file = project_root / "tests/test_contentview.py"
+    test_file.write_text(
+        test_file.read_text() + "\n    def test_positive_host(self):\n"
+        "        entities.Host().create()\n"
+    )
+    results = state.query(entity_methods=HOSTS)
+    assert results["cov_tests"]["test_contentview.py:TestContentView:test_positive_host"] == [
+        "Host create"
+    ]
+    # the conftest provides no host coverage, but changing it is picked up too
+    (project_root / "conftest.py").write_text("")
+    results = state.query(entity_methods=ENTITY_METHODS)
+    assert "Organization create" not in results["cov_tests"]["test_host.py:test_positive_create"]
+
+
+def test_positive_query_sees_new_conftest(tmp_path):
+    project_root, state = make_state(tmp_path)
+    state.query(entity_methods=ENTITY_METHODS)
+    # the new conftest overrides module_org for every test beneath it
+    (project_root / "tests/conftest.py").write_text(CONTENTVIEW_CONFTEST)
+    results = state.query(entity_methods=ENTITY_METHODS)
+    assert results["cov_tests"]["test_host.py:test_positive_create"] == [
+        "ContentView create",
+        "Host create",
+        "Host update",
+    ]
+
+
+def test_positive_socket_round_trip(tmp_path):
+    _, state = make_state(tmp_path / "project")
+    socket_path = tmp_path / "plinko.sock"
+    analysis_server = server.AnalysisServer(state, socket_path)
+    thread = threading.Thread(target=analysis_server.serve)
+    thread.start()
+    try:
+        response = server.send({"op": "query", "entity_methods": HOSTS}, socket_path)
+        assert response["ok"]
+        assert list(response["cov_tests"]) == ["test_host.py:test_positive_create"]
+        response = server.send({"op": "bogus"}, socket_path)
+        assert not response["ok"]
+        assert "bogus" in response["error"]
+    finally:
+        server.send({"op": "stop"}, socket_path)
+        thread.join(timeout=10)
+    assert not socket_path.exists()
@@ -0,0 +1,37 @@
+"""This module exercises the SetCover used to find minimal tests"""
+from plinko import helpers
+from plinko.set_cover import SetCover
+
+
+def test_positive_greedy_prefers_larger_tests():
+    tests = {
+        "test_org": {"Organization create"},
+        "test_host": {"Host create"},
+        "test_both": {"Organization create", "Host create", "Host update"},
+        "test_empty": set(),
+    }
+    assert SetCover(tests).minimal() == {"test_both": tests["test_both"]}
+
+
+def test_positive_redundant_tests_dropped():
+    # test_big is picked first, but the other two cover it entirely
+    tests = {
+        "test_big": {"A", "B", "C", "D"},
+        "test_left": {"A", "B", "E"},
+        "test_right": {"C", "D", "F"},
+    }
+    assert list(SetCover(tests).minimal()) == ["test_left", "test_right"]
+
+
+def test_positive_min_tests_expand():
+    tests = {
+        "test_host.py:TestHost:test_create": {"Host create", "Host update"},
+        "test_host.py:test_update": {"Host update"},
+    }
+    expanded = helpers.expand_dict_keys(helpers.get_min_tests(tests))
+    assert list(expanded) == ["test_host.py"]
+    assert list(expanded["test_host.py"]) == ["TestHost"]
+    assert sorted(expanded["test_host.py"]["TestHost"]["test_create"]) == [
+        "Host create",
+        "Host update",
+    ]
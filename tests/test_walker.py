@@ -0,0 +1,53 @@
+"""This module exercises the file walker"""
+from plinko import helpers, walker
+
+
+def make_tree(tmp_path, files):
+    for name in files:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text("")
+    return tmp_path
+
+
+def walk(tmp_path, **kwargs):
+    kwargs = {"exclude": [], "gitignore": True, **kwargs}
+    return sorted(
+        path.relative_to(tmp_path).as_posix()
+        for path in walker.walk_files(tmp_path, ".py", **kwargs)
+    )
+
+
+def test_positive_gitignore(tmp_path):
+    make_tree(
+        tmp_path,
+        [
+            ".git/config",
+            "tests/test_a.py",
+            "tests/build/test_b.py",
+            "venv/lib/mod.py",
+            "tests/gen_c.py",
+            "tests/gen_keep.py",
+            "tests/sub/notes.txt",
+        ],
+    )
+    (tmp_path / ".gitignore").write_text("# comment\nvenv/\n/tests/build\n")
+    (tmp_path / "tests/.gitignore").write_text("gen_*.py\n!gen_keep.py\n")
+    assert walk(tmp_path) == ["tests/gen_keep.py", "tests/test_a.py"]
+    # rules above the walked directory apply too, up to the repository root
+    assert walk(tmp_path / "tests") == ["gen_keep.py", "test_a.py"]
+    assert len(walk(tmp_path, gitignore=False)) == 5
+
+
+def test_positive_include_exclude(tmp_path):
+    make_tree(tmp_path, ["tests/test_a.py", "tests/helper.py", "vendor/test_v.py"])
+    assert walk(tmp_path, include=["test_*.py"], exclude=["vendor"]) == ["tests/test_a.py"]
+    assert walk(tmp_path, exclude=["tests/*"]) == ["vendor/test_v.py"]
+
+
+def test_positive_recurse_up(tmp_path):
+    make_tree(tmp_path, ["conftest.py", "tests/conftest.py", "tests/api/test_a.py"])
+    found = helpers.recurse_up(tmp_path / "tests/api", tmp_path, ".py", "test_")
+    assert found == [tmp_path.resolve() / "tests/conftest.py", tmp_path.resolve() / "conftest.py"]
+    # a new file changes the directory, so its cached listing is refreshed
+    (tmp_path / "tests/api/conftest.py").write_text("")
+    assert len(helpers.recurse_up(tmp_path / "tests/api", tmp_path, ".py", "test_")) == 3